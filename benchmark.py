@@ -0,0 +1,679 @@
+"""
+Бенчмарки без Kivy: запуск `python benchmark.py [назва]`.
+Синтетичні банки білетів створюються у тимчасовій теці.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import replace
+
+from storage import (
+    load_data,
+    migrate_to_sharded,
+    save_data,
+)
+from image_store import ImageStore
+from instrumentation import Metrics
+from core import TicketRepository, apply_question_change, apply_ticket_change
+from rich_text import estimate_height, parse_blocks, to_markup
+from models import Question, Ticket, natural_key
+from scheduler import Scheduler
+from sqlite_storage import import_json
+from ticket_store import TicketStore
+
+TICKET_COUNTS = (100, 1000, 5000)
+
+
+WORDS = (
+    "інтеграл похідна матриця вектор функція границя ряд множина граф алгоритм "
+    "теорема доведення рівняння нерівність ймовірність дисперсія"
+).split()
+
+
+def bank_id(i):
+    # Передбачувані id, щоб бенчмарки могли звертатися до конкретного білета.
+    return f"{i:032x}"
+
+
+def make_bank(ticket_count, answer_len=200):
+    bank = {}
+    for i in range(1, ticket_count + 1):
+        bank[bank_id(i)] = {
+            "name": f"Білет {i}",
+            "questions": [
+                {
+                    "text": f"Запитання {j} {WORDS[(i * 7 + j) % len(WORDS)]} {i}-{j}",
+                    "answer_text": " ".join(
+                        WORDS[(i + j + k) % len(WORDS)] for k in range(answer_len // 10)
+                    ),
+                    "answer_image": "",
+                }
+                for j in range(1, 7)
+            ]
+        }
+    return bank
+
+
+def search_data(data, query, limit=50):
+    # Перебір словників — так шукали б до появи індексу.
+    words = query.lower().split()
+    if not words:
+        return []
+    results = []
+    for ticket_id, ticket in data.items():
+        for idx, q in enumerate(ticket.get("questions", [])):
+            haystack = f"{q.get('text', '')} {q.get('answer_text', '')}".lower()
+            if all(w in haystack for w in words):
+                results.append((ticket_id, idx, q.get("text", "")))
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def timed(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_navigation():
+    print("Навігація: відкриття білета (мс на дію)")
+    print(f"{'білетів':>8} {'load_data':>12} {'TicketStore':>12}")
+    for count in TICKET_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.json")
+            save_data(make_bank(count), path)
+            ticket_id = bank_id(count // 2)
+
+            def old_way():
+                load_data(path).get(ticket_id, {}).get("questions", [])
+
+            store = TicketStore(path)
+            store.load()
+
+            def new_way():
+                store.get_questions(ticket_id)
+
+            print(f"{count:>8} {timed(old_way, 5):>12.3f} {timed(new_way):>12.4f}")
+            store.close()
+
+
+def bench_browse_writes():
+    print("Перегляд 50 білетів і одна правка: кількість записів на диск")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.json")
+        save_data(make_bank(1000), path)
+        store = TicketStore(path, flush_delay=0)
+        repo = TicketRepository(store)
+        for i in range(1, 51):
+            # Той самий шлях читання, що й екран білета.
+            repo.question_rows(bank_id(i))
+            store.flush()
+        browse_writes = store.write_count
+        question = replace(store.get_questions(bank_id(1))[0], answer_text="нова відповідь")
+        store.set_question(bank_id(1), 0, question)
+        store.flush()
+        print(f"перегляд: {browse_writes}, після правки: {store.write_count}")
+        store.close()
+
+
+def bench_save_one():
+    print("Збереження однієї відповіді (мс на запис)")
+    print(f"{'білетів':>8} {'один JSON':>12} {'файл/білет':>12}")
+    for count in TICKET_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "bank.json")
+            shard_dir = os.path.join(tmp, "tickets")
+            save_data(make_bank(count), json_path)
+            migrate_to_sharded(json_path, shard_dir)
+            results = []
+            for path in (json_path, shard_dir):
+                store = TicketStore(path, flush_delay=0)
+                store.load()
+                counter = iter(range(10**6))
+
+                def edit_and_flush():
+                    question = Question("Запитання 1", str(next(counter)))
+                    store.set_question(bank_id(count // 2), 0, question)
+                    store.flush()
+
+                results.append(timed(edit_and_flush, 10))
+                store.close()
+            print(f"{count:>8} {results[0]:>12.3f} {results[1]:>12.3f}")
+
+
+def bench_search():
+    print("Пошук на банку з 50 000 запитань (мс на запит)")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "bank.json")
+        db_path = os.path.join(tmp, "bank.db")
+        save_data(make_bank(50000 // 6 + 1), json_path)
+        start = time.perf_counter()
+        import_json(json_path, db_path)
+        print(f"імпорт у SQLite: {time.perf_counter() - start:.2f} с")
+        query = "5000-3"
+
+        def json_scan():
+            search_data(load_data(json_path), query)
+
+        data = load_data(json_path)
+        store = TicketStore(db_path)
+
+        def memory_scan():
+            search_data(data, query)
+
+        def fts_lookup():
+            store.search(query)
+
+        print(f"JSON з диска + перебір: {timed(json_scan, 3):.2f}")
+        print(f"перебір у пам'яті:      {timed(memory_scan, 5):.2f}")
+        print(f"FTS5:                   {timed(fts_lookup):.3f}")
+        store.close()
+
+
+def _list_build_child(mode, count):
+    # Виконується в окремому процесі, щоб RSS не змішувався між замірами.
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    from kivy.clock import Clock
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.button import Button
+    from kivy.uix.image import Image
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.recycleboxlayout import RecycleBoxLayout
+    from kivy.uix.scrollview import ScrollView
+
+    names = [f"Білет {i}" for i in range(1, count + 1)]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "widgets":
+        root = ScrollView(size=(400, 800))
+        layout = BoxLayout(orientation="vertical", size_hint_y=None)
+        root.add_widget(layout)
+        for name in names:
+            row = BoxLayout(size_hint_y=None, height=50)
+            row.add_widget(Button(text=name, size_hint_x=0.8))
+            row.add_widget(Image(size_hint_x=None, width=40))
+            layout.add_widget(row)
+    else:
+        root = RecycleView(size=(400, 800), viewclass="Button")
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            default_size=(None, 50),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        root.add_widget(layout)
+        root.data = [{"text": name} for name in names]
+    Clock.tick()
+    elapsed = (time.perf_counter() - start) * 1000
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.1f} {(rss_after - rss_before) / 1024:.1f}")
+
+
+def bench_list_build():
+    print("Побудова списку білетів (потрібен Kivy): мс / приріст RSS, МБ")
+    print(f"{'білетів':>8} {'віджети':>16} {'RecycleView':>16}")
+    for count in (100, 1000, 10000):
+        cells = []
+        for mode in ("widgets", "recycle"):
+            result = subprocess.run(
+                [sys.executable, __file__, "--child-list-build", mode, str(count)],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                print("Kivy недоступний, бенчмарк пропущено.")
+                return
+            elapsed, rss = result.stdout.split()[-2:]
+            cells.append(f"{elapsed} / {rss}")
+        print(f"{count:>8} {cells[0]:>16} {cells[1]:>16}")
+
+
+def bench_startup():
+    print("Холодний старт main.py (потрібен Kivy і дисплей)")
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        cwd=here,
+        env=env,
+    )
+    if result.returncode != 0:
+        print("Kivy недоступний, бенчмарк пропущено.")
+        return
+    # Рядки -X importtime: "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print("Найдорожчі імпорти (сукупно, мс):")
+    for cumulative, name in sorted(rows, reverse=True)[:15]:
+        print(f"{cumulative / 1000:>10.1f}  {name}")
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "main.py"],
+        capture_output=True,
+        text=True,
+        cwd=here,
+        env=dict(env, EXAMTICKETS_STARTUP_PROBE="1"),
+    )
+    if "FIRST_FRAME" in result.stdout:
+        print(f"До першого кадру: {(time.perf_counter() - start) * 1000:.0f} мс")
+    else:
+        print("Не вдалося дочекатися першого кадру.")
+
+
+def bench_core():
+    print("Гарячі шляхи core.TicketRepository (мс на операцію)")
+    header = f"{'запитань':>9} {'сховище':>8} {'load':>9} {'save':>8} {'rename':>8} {'add':>8} {'search':>8}"
+    print(header)
+    for question_count in (1000, 10000, 100000):
+        ticket_count = question_count // 6
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "bank.json")
+            save_data(make_bank(ticket_count), json_path)
+            paths = {
+                "json": json_path,
+                "shards": os.path.join(tmp, "tickets"),
+                "sqlite": os.path.join(tmp, "bank.db"),
+            }
+            migrate_to_sharded(json_path, paths["shards"])
+            import_json(json_path, paths["sqlite"])
+            for kind, path in paths.items():
+                repo = TicketRepository(TicketStore(path, flush_delay=60))
+                start = time.perf_counter()
+                repo.store.load()
+                load_ms = (time.perf_counter() - start) * 1000
+                counter = iter(range(10**6))
+                target = bank_id(ticket_count // 2)
+
+                def save():
+                    repo.save_question(target, 0, "Запитання", str(next(counter)))
+                    repo.store.flush()
+
+                names = iter(range(10**6))
+
+                def rename():
+                    repo.rename_ticket(target, f"Перейменований {next(names)}")
+                    repo.store.flush()
+
+                def add():
+                    repo.add_ticket(f"Новий {next(names)}", ["Запитання 1"])
+                    repo.store.flush()
+
+                def search():
+                    repo.search(f"{ticket_count // 3}-2")
+
+                print(
+                    f"{question_count:>9} {kind:>8} {load_ms:>9.1f} {timed(save, 3):>8.2f}"
+                    f" {timed(rename, 3):>8.2f} {timed(add, 3):>8.2f} {timed(search, 3):>8.2f}"
+                )
+                repo.store.close()
+
+
+def bench_memory():
+    print("Пам'ять банку з 50 000 запитань у пам'яті (МБ, tracemalloc)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.json")
+        bank = make_bank(50000 // 6 + 1)
+        # Типовий банк: більшість запитань — ще не заповнені заготовки.
+        for i, ticket in enumerate(bank.values()):
+            for j, q in enumerate(ticket["questions"]):
+                q["text"] = f"Запитання {j + 1}"
+                if (i + j) % 3:
+                    q["answer_text"] = ""
+        save_data(bank, path)
+        del bank
+
+        tracemalloc.start()
+        raw = load_data(path)
+        dict_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        raw = load_data(path)
+        tickets = {tid: Ticket.from_dict(t) for tid, t in raw.items()}
+        del raw
+        model_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tickets
+        print(f"словники: {dict_size / 2**20:.1f}")
+        print(f"models:   {model_size / 2**20:.1f} (-{100 - model_size * 100 / dict_size:.0f}%)")
+
+
+def bench_scheduler():
+    print("Планувальник повторень: наступна картка і оцінка (мкс на операцію)")
+    print(f"{'карток':>8} {'next_due':>10} {'review':>10}")
+    for count in (1000, 10000, 100000):
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = Scheduler(
+                os.path.join(tmp, "state.json"), os.path.join(tmp, "log.jsonl")
+            ).load()
+            scheduler.add_cards(((bank_id(i // 6), i % 6) for i in range(count)), now=0)
+            now = iter(range(1, 10**6))
+
+            def review():
+                key = scheduler.next_due(10**9)
+                scheduler.review(key, 4, next(now))
+
+            next_us = timed(lambda: scheduler.next_due(10**9), 1000) * 1000
+            review_us = timed(review, 1000) * 1000
+            print(f"{count:>8} {next_us:>10.2f} {review_us:>10.2f}")
+
+
+def bench_order():
+    print("Список білетів у природному порядку (мс на дію)")
+    print(f"{'білетів':>8} {'sorted':>10} {'індекс':>10} {'rename':>10}")
+    for count in (1000, 10000, 100000):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.json")
+            save_data(make_bank(count, answer_len=0), path)
+            store = TicketStore(path, flush_delay=60)
+            data = store.load()
+            names = iter(range(10**6))
+
+            def sort_each_time():
+                # Так список будувався до індексу: сортування при кожному вході на екран.
+                sorted(data, key=lambda tid: natural_key(data[tid].name))
+
+            def rename():
+                store.rename_ticket(bank_id(count // 2), f"Білет {count + next(names)}")
+
+            print(
+                f"{count:>8} {timed(sort_each_time, 5):>10.2f}"
+                f" {timed(store.ticket_ids, 5):>10.2f} {timed(rename, 100):>10.3f}"
+            )
+            store.close()
+
+
+def bench_list_patch():
+    # Рахуємо словники рядків, які довелося побудувати: RecycleView оновлює
+    # віджети лише для змінених елементів data, тож це і є ціна правки для UI.
+    print("Рядків списку, перебудованих на одну дію (банк з 5000 білетів)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.json")
+        save_data(make_bank(5000, answer_len=20), path)
+        repo = TicketRepository(TicketStore(path, flush_delay=60))
+        built = [0]
+
+        def ticket_row(ticket_id):
+            built[0] += 1
+            return {"ticket_id": ticket_id, "name": repo.ticket_name(ticket_id)}
+
+        def question_row(index):
+            built[0] += 1
+            return dict(zip(("question_index", "text", "filled"), repo.question_row(target, index)))
+
+        target = bank_id(2500)
+        ticket_rows = [ticket_row(ticket_id) for ticket_id in repo.store.ticket_ids()]
+        question_rows = [question_row(i) for i in range(6)]
+        full_rebuild = len(ticket_rows) + len(question_rows)
+
+        def on_change(change):
+            apply_ticket_change(ticket_rows, change, ticket_row)
+            if change.ticket_id == target:
+                apply_question_change(question_rows, change, question_row)
+
+        repo.subscribe(on_change)
+        actions = {
+            "відповідь": lambda: repo.save_question(target, 0, "Запитання", "нова відповідь"),
+            "перейменування": lambda: repo.rename_ticket(target, "Білет 1a"),
+            "новий білет": lambda: repo.add_ticket("Білет 4999a", ["Запитання 1"]),
+            "видалення": lambda: repo.delete_ticket(bank_id(3)),
+        }
+        for label, action in actions.items():
+            built[0] = 0
+            action()
+            print(f"{label:>15}: {built[0]} (повна перебудова: {full_rebuild})")
+        # Після всіх подій список збігається з порядком у сховищі.
+        assert [row["ticket_id"] for row in ticket_rows] == repo.store.ticket_ids()
+        repo.close()
+
+
+def bench_sync():
+    from sync import SyncClient, make_server
+
+    print("Синхронізація: вартість обміну після N правок (мс / КБ на машину)")
+    print(f"{'білетів':>8} {'правок':>7} {'надіслати':>16} {'отримати':>16}")
+    for count in (1000, 10000):
+        with tempfile.TemporaryDirectory() as tmp:
+            httpd = make_server(os.path.join(tmp, "server"), port=0)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{httpd.server_address[1]}"
+            clients = []
+            for name in ("a", "b"):
+                root = os.path.join(tmp, name)
+                path = os.path.join(root, "bank.json")
+                os.makedirs(root)
+                save_data(make_bank(count) if name == "a" else {}, path)
+                store = TicketStore(path, flush_delay=60)
+                client = SyncClient(
+                    url,
+                    store,
+                    ImageStore(os.path.join(root, "images"), root),
+                    os.path.join(root, "sync.db"),
+                    os.path.join(root, "conflicts.jsonl"),
+                )
+                clients.append((store, client))
+            (store_a, sync_a), (store_b, sync_b) = clients
+            # Початкове наповнення сервера і другої машини — один раз.
+            sync_a.sync()
+            sync_b.sync()
+            counter = iter(range(10**6))
+            for edits in (1, 10, 100):
+                for i in range(1, edits + 1):
+                    store_a.set_question(bank_id(i), 0, Question("Запитання", str(next(counter))))
+                start = time.perf_counter()
+                sent = sync_a.sync()
+                push_ms = (time.perf_counter() - start) * 1000
+                start = time.perf_counter()
+                received = sync_b.sync()
+                pull_ms = (time.perf_counter() - start) * 1000
+                push_kb = (sent["bytes_sent"] + sent["bytes_received"]) / 1024
+                pull_kb = (received["bytes_sent"] + received["bytes_received"]) / 1024
+                print(
+                    f"{count:>8} {edits:>7} {push_ms:>7.1f} / {push_kb:>6.1f}"
+                    f" {pull_ms:>7.1f} / {pull_kb:>6.1f}"
+                )
+            for store, client in clients:
+                client.close()
+                store.close()
+            httpd.shutdown()
+            httpd.sync_server.close()
+
+
+def bench_instrumentation():
+    print("Ціна замірів на одну дію (мкс)")
+    print(f"{'заміри':>8} {'timer':>8} {'count':>8}")
+    repeat = 100000
+    for enabled in (False, True):
+        m = Metrics(enabled=enabled)
+
+        def timer():
+            with m.timer("bench"):
+                pass
+
+        print(
+            f"{'увімк.' if enabled else 'вимк.':>8}"
+            f" {timed(timer, repeat) * 1000:>8.3f}"
+            f" {timed(lambda: m.count('bench'), repeat) * 1000:>8.3f}"
+        )
+
+
+def make_markdown_answer(size):
+    # Типова довга шпаргалка: заголовки, абзаци, списки, формули й таблиці.
+    parts, i = [], 0
+    while sum(map(len, parts)) < size:
+        i += 1
+        words = " ".join(WORDS[(i + k) % len(WORDS)] for k in range(40))
+        parts.append(
+            f"## Розділ {i}\n\n{words} **{WORDS[i % len(WORDS)]}** і *курсив*.\n"
+            f"{words}\n\n- пункт {i}\n- ще пункт `код`\n\n$$\nx_{i} = a^2 + b^2\n$$\n\n"
+            f"| величина | значення |\n|---|---|\n| a | {i} |\n| b | {i * 2} |\n\n"
+        )
+    return "".join(parts)
+
+
+def bench_rich_text():
+    print("Відкриття відповіді в Markdown (мс; бюджет кадру 16.7)")
+    print(f"{'КБ':>6} {'блоків':>7} {'розбір':>8} {'видимі':>8}")
+    width, font_size, visible = 400, 15, 12
+    for size in (5_000, 50_000, 200_000):
+        text = make_markdown_answer(size)
+        blocks = parse_blocks(text)
+
+        def open_answer():
+            # Те, що робиться синхронно при відкритті: розбір і оцінка висот.
+            for block in parse_blocks(text):
+                estimate_height(block, width, font_size)
+
+        def first_screen():
+            # Розмітка лише для блоків, що вміщаються на екран.
+            for block in blocks[:visible]:
+                to_markup(block, font_size)
+
+        print(
+            f"{len(text) // 1024:>6} {len(blocks):>7}"
+            f" {timed(open_answer, 10):>8.2f} {timed(first_screen, 100):>8.3f}"
+        )
+
+
+def bench_workers():
+    print("Збереження запитання з новим зображенням: час у потоці UI (мс)")
+    print(f"{'МБ':>4} {'синхронно':>10} {'у фоні':>8} {'до кінця':>9}")
+    for size_mb in (1, 10, 50):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.json")
+            save_data(make_bank(100, answer_len=0), path)
+            image_store = ImageStore(root_dir=tmp, images_dir=os.path.join(tmp, "images"))
+            repo = TicketRepository(TicketStore(path, flush_delay=60), image_store)
+            results = []
+            for mode in ("sync", "async"):
+                # Щоразу новий вміст, інакше файл не копіюватиметься вдруге.
+                image = os.path.join(tmp, f"{mode}.png")
+                with open(image, "wb") as f:
+                    f.write(os.urandom(size_mb * 1024 * 1024))
+                start = time.perf_counter()
+                if mode == "sync":
+                    repo.save_question(bank_id(1), 0, "q", "a", image)
+                else:
+                    future = repo.save_question_async(bank_id(1), 0, "q", "a", image)
+                results.append((time.perf_counter() - start) * 1000)
+            future.result()
+            total = (time.perf_counter() - start) * 1000
+            print(f"{size_mb:>4} {results[0]:>10.2f} {results[1]:>8.3f} {total:>9.2f}")
+            repo.close()
+
+
+def bench_print():
+    from print_export import render_bank_html
+
+    print("Банк для друку (с): перший експорт і повторний після 5 правок")
+    print(f"{'білетів':>8} {'процеси':>8} {'перший':>8} {'повторний':>10} {'рендер':>7}")
+    for count in (100, 1000):
+        with tempfile.TemporaryDirectory() as tmp:
+            bank = make_bank(count)
+            images_dir = os.path.join(tmp, "images")
+            os.makedirs(images_dir)
+            for i, (ticket_id, ticket) in enumerate(bank.items()):
+                # Кожен білет зі своїм зображенням ~50 КБ.
+                name = f"{ticket_id}.png"
+                with open(os.path.join(images_dir, name), "wb") as f:
+                    f.write(os.urandom(50 * 1024))
+                ticket["questions"][0]["answer_image"] = f"images/{name}"
+            path = os.path.join(tmp, "bank.json")
+            image_store = ImageStore(images_dir=images_dir, root_dir=tmp)
+            for workers in (1, None):
+                save_data(bank, path)
+                cache_dir = os.path.join(tmp, f"cache-{workers}")
+                start = time.perf_counter()
+                render_bank_html(path, image_store, cache_dir, workers=workers)
+                first = time.perf_counter() - start
+                for i in range(1, 6):
+                    bank[bank_id(i * 7)]["questions"][1]["answer_text"] += " правка"
+                save_data(bank, path)
+                start = time.perf_counter()
+                _, stats = render_bank_html(path, image_store, cache_dir, workers=workers)
+                again = time.perf_counter() - start
+                print(
+                    f"{count:>8} {workers or 'усі':>8} {first:>8.2f} {again:>10.3f}"
+                    f" {stats['rendered']:>7}"
+                )
+
+
+def bench_check():
+    from integrity import check_bank, salvage_tickets
+    from storage import serialize_data
+
+    print("Перевірка цілісності (мс): має рости лінійно з розміром банку")
+    print(f"{'білетів':>8} {'перевірка':>10} {'порятунок':>10}")
+    for count in (1000, 10000, 50000):
+        with tempfile.TemporaryDirectory() as tmp:
+            bank = make_bank(count, answer_len=50)
+            images_dir = os.path.join(tmp, "images")
+            os.makedirs(images_dir)
+            for i, ticket in enumerate(bank.values()):
+                name = f"{i:064x}.png"
+                if i % 10:
+                    # Кожне десяте посилання веде на відсутній файл.
+                    open(os.path.join(images_dir, name), "wb").close()
+                # Частина шляхів — у стилі Windows.
+                sep = "\\" if i % 3 == 0 else "/"
+                ticket["questions"][0]["answer_image"] = f"images{sep}{name}"
+            image_store = ImageStore(images_dir=images_dir, root_dir=tmp)
+            text = serialize_data(bank)
+            # Пошкоджуємо кожен сотий білет.
+            broken = text.replace('"answer_text": "', '"answer_text": ,"', count // 100)
+
+            start = time.perf_counter()
+            report = check_bank(bank, image_store)
+            check_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            tickets, errors = salvage_tickets(broken)
+            salvage_ms = (time.perf_counter() - start) * 1000
+            assert len(report.dangling) == count // 10 and len(tickets) + len(errors) == count
+            print(f"{count:>8} {check_ms:>10.1f} {salvage_ms:>10.1f}")
+
+
+BENCHMARKS = {
+    "navigation": bench_navigation,
+    "browse_writes": bench_browse_writes,
+    "save_one": bench_save_one,
+    "search": bench_search,
+    "list_build": bench_list_build,
+    "startup": bench_startup,
+    "core": bench_core,
+    "memory": bench_memory,
+    "scheduler": bench_scheduler,
+    "order": bench_order,
+    "list_patch": bench_list_patch,
+    "sync": bench_sync,
+    "instrumentation": bench_instrumentation,
+    "rich_text": bench_rich_text,
+    "workers": bench_workers,
+    "print": bench_print,
+    "check": bench_check,
+}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child-list-build"]:
+        _list_build_child(sys.argv[2], int(sys.argv[3]))
+        sys.exit()
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for bench_name in names:
+        BENCHMARKS[bench_name]()
+        print()
@@ -0,0 +1,362 @@
+"""
+Командний рядок для роботи з банком білетів без графічного інтерфейсу.
+Kivy тут не імпортується.
+
+    python cli.py export bank.jsonl
+    python cli.py import bank.zip --on-conflict rename
+    python cli.py print bank.html
+    python cli.py check --repair
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from itertools import groupby
+
+from image_store import ImageStore, normalize_image_path
+from instrumentation import configure_logging, get_logger
+from models import unique_name
+from storage import get_backend, new_ticket_id
+
+FIELDS = ("ticket", "index", "text", "answer_text", "answer_image")
+ZIP_QUESTIONS = "questions.jsonl"
+CONFLICT_POLICIES = ("skip", "replace", "rename", "fail")
+BATCH_SIZE = 200
+
+log = get_logger(__name__)
+
+
+class ConflictError(Exception):
+    pass
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return {".jsonl": "jsonl", ".csv": "csv", ".zip": "zip"}.get(ext, "jsonl")
+
+
+# --- Експорт ---
+
+
+def iter_records(backend):
+    # У файлах обміну білет ідентифікується назвою: id — внутрішня справа сховища.
+    for _, ticket in backend.iter_tickets():
+        name = ticket.get("name", "")
+        questions = ticket.get("questions", [])
+        if not questions:
+            # Порожній білет — один запис без індексу, щоб він не загубився.
+            yield dict.fromkeys(FIELDS, "") | {"ticket": name, "index": None}
+        for idx, q in enumerate(questions):
+            yield {
+                "ticket": name,
+                "index": idx,
+                "text": q.get("text", ""),
+                "answer_text": q.get("answer_text", ""),
+                "answer_image": q.get("answer_image", ""),
+            }
+
+
+def write_jsonl(records, f):
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        yield record
+
+
+def write_csv(records, f):
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield record
+
+
+def export_bank(out_path, fmt=None, data_path=None, image_store=None):
+    fmt = detect_format(out_path, fmt)
+    backend = get_backend(data_path)
+    image_store = image_store or ImageStore()
+    count = 0
+    start = time.perf_counter()
+    if fmt == "zip":
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            added_images = set()
+            with zf.open(ZIP_QUESTIONS, "w") as raw:
+                f = io.TextIOWrapper(raw, encoding="utf-8")
+                for record in write_jsonl(iter_records(backend), f):
+                    count += record["index"] is not None
+                    image = normalize_image_path(record["answer_image"])
+                    if image:
+                        added_images.add(image)
+                f.flush()
+                f.detach()
+            # Зображення дописуємо після запитань: zip не дозволяє
+            # два одночасно відкриті записи.
+            for image in sorted(added_images):
+                abs_path = image_store.to_absolute(image)
+                if os.path.exists(abs_path):
+                    zf.write(abs_path, image)
+    else:
+        newline = "" if fmt == "csv" else None
+        with open(out_path, "w", encoding="utf-8", newline=newline) as f:
+            writer = write_csv if fmt == "csv" else write_jsonl
+            for record in writer(iter_records(backend), f):
+                count += record["index"] is not None
+    report(count, start, f"Експортовано до {out_path}")
+    return count
+
+
+# --- Імпорт ---
+
+
+def read_jsonl(f):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            log.warning("Рядок %d пропущено: %s", line_no, e)
+
+
+def read_csv(f):
+    yield from csv.DictReader(f)
+
+
+def group_tickets(records):
+    """
+    Збирає послідовні записи одного білета.
+    У пам'яті одночасно лише один білет.
+    """
+    for name, group in groupby(records, key=lambda r: r.get("ticket", "")):
+        questions = []
+        for position, record in enumerate(group):
+            index = record.get("index", position)
+            if index is None or index == "":
+                continue
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                index = position
+            questions.append((index, record))
+        questions.sort(key=lambda item: item[0])
+        yield name, [record for _, record in questions]
+
+
+def scan_names(tickets):
+    """
+    Назви білетів у файлі. Записи одного білета мусять іти підряд:
+    інакше group_tickets розрізав би білет на кілька частин.
+    """
+    names = set()
+    for name, _ in tickets:
+        name = name.strip()
+        if not name:
+            continue
+        if name in names:
+            raise ImportFormatError(
+                f"Записи білета '{name}' розкидані по файлу: "
+                "рядки одного білета мають іти підряд."
+            )
+        names.add(name)
+    return names
+
+
+def import_tickets(read_tickets, backend, on_conflict="skip", resolve_image=None):
+    """
+    read_tickets() щоразу відкриває вхідний файл заново і повертає пари
+    (назва, записи) з group_tickets. Файл читається двічі: спершу лише назви.
+    """
+    stats = {"imported": 0, "skipped": 0, "questions": 0}
+    # Формат «один файл» інакше як цілком не записати.
+    full_data = None if backend.incremental else backend.load()
+    if full_data is not None:
+        index = {tid: ticket.get("name", "") for tid, ticket in full_data.items()}
+    else:
+        index = backend.ticket_index()
+    # {назва: id} білетів, що вже були в банку; «replace» перезаписує білет
+    # під його старим id. Білети цього імпорту сюди не потрапляють.
+    existing = {name: tid for tid, name in index.items()}
+    # Перший прохід — лише назви: помилка посеред файлу не має лишити банк
+    # імпортованим наполовину, а тримати весь імпорт у пам'яті не можна.
+    incoming = scan_names(read_tickets())
+    if on_conflict == "fail":
+        conflicts = sorted(incoming & existing.keys())
+        if conflicts:
+            raise ConflictError(f"Білет з такою назвою вже існує: {conflicts[0]}")
+    # Нова назва з «rename» не має збігтися ні з банком, ні з іншим білетом файлу.
+    taken = existing.keys() | incoming
+    batch = {}
+
+    def flush_batch():
+        if batch:
+            backend.save_tickets(dict(batch))
+            batch.clear()
+
+    for name, records in read_tickets():
+        name = name.strip()
+        if not name:
+            continue
+        ticket_id = None
+        if name in existing:
+            if on_conflict == "skip":
+                stats["skipped"] += 1
+                continue
+            if on_conflict == "rename":
+                name = unique_name(name, taken.__contains__)
+                taken.add(name)
+            else:
+                ticket_id = existing[name]
+        questions = []
+        for record in records:
+            image = record.get("answer_image", "") or ""
+            if image and resolve_image is not None:
+                image = resolve_image(image)
+            questions.append(
+                {
+                    "text": record.get("text", "") or "",
+                    "answer_text": record.get("answer_text", "") or "",
+                    "answer_image": image,
+                }
+            )
+        ticket_id = ticket_id or new_ticket_id()
+        stats["imported"] += 1
+        stats["questions"] += len(questions)
+        ticket = {"name": name, "questions": questions}
+        if full_data is not None:
+            full_data[ticket_id] = ticket
+        else:
+            batch[ticket_id] = ticket
+            if len(batch) >= BATCH_SIZE:
+                flush_batch()
+
+    if full_data is not None:
+        backend.save(full_data)
+    else:
+        flush_batch()
+    return stats
+
+
+def import_bank(in_path, fmt=None, data_path=None, on_conflict="skip", image_store=None):
+    fmt = detect_format(in_path, fmt)
+    backend = get_backend(data_path, migrate=True)
+    image_store = image_store or ImageStore()
+    start = time.perf_counter()
+    if fmt == "zip":
+        with zipfile.ZipFile(in_path) as zf:
+            members = set(zf.namelist())
+            cache = {}
+
+            def resolve_image(image):
+                # Зображення з архіву потрапляють у сховище за хешем вмісту.
+                image = normalize_image_path(image)
+                if image not in cache:
+                    if image in members:
+                        with zf.open(image) as src:
+                            cache[image] = image_store.add_stream(
+                                src, os.path.splitext(image)[1]
+                            )
+                    else:
+                        cache[image] = image
+                return cache[image]
+
+            def read_tickets():
+                with zf.open(ZIP_QUESTIONS) as raw:
+                    yield from group_tickets(read_jsonl(io.TextIOWrapper(raw, encoding="utf-8")))
+
+            stats = import_tickets(read_tickets, backend, on_conflict, resolve_image)
+    else:
+        newline = "" if fmt == "csv" else None
+
+        def read_tickets():
+            with open(in_path, "r", encoding="utf-8", newline=newline) as f:
+                records = read_csv(f) if fmt == "csv" else read_jsonl(f)
+                yield from group_tickets(records)
+
+        stats = import_tickets(read_tickets, backend, on_conflict)
+    report(
+        stats["questions"],
+        start,
+        f"Імпортовано білетів: {stats['imported']}, пропущено: {stats['skipped']}",
+    )
+    return stats
+
+
+def print_bank(out_path, data_path=None, workers=None):
+    # Рендеринг тягне rich_text і пул процесів — імпортуємо лише для цієї команди.
+    from print_export import ExportError, export_print
+
+    start = time.perf_counter()
+    try:
+        stats = export_print(out_path, data_path, workers=workers)
+    except ExportError as e:
+        print(f"⚠️ {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    print(
+        f"Збережено до {out_path}: {stats['tickets']} білетів "
+        f"(відрендерено {stats['rendered']}, з кешу {stats['cached']}) за {elapsed:.2f} с"
+    )
+    return 0
+
+
+def report(questions, start, message):
+    elapsed = time.perf_counter() - start
+    rate = questions / elapsed if elapsed > 0 else 0
+    print(f"{message}. {questions} запитань за {elapsed:.2f} с ({rate:.0f} запитань/с)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Банк екзаменаційних білетів")
+    parser.add_argument("--data", help="шлях до даних (.json, .db або тека з маніфестом)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="експорт банку")
+    p_export.add_argument("path")
+    p_export.add_argument("--format", choices=("jsonl", "csv", "zip"))
+
+    p_import = sub.add_parser("import", help="імпорт банку")
+    p_import.add_argument("path")
+    p_import.add_argument("--format", choices=("jsonl", "csv", "zip"))
+    p_import.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default="skip")
+
+    p_print = sub.add_parser("print", help="банк для друку: HTML або PDF")
+    p_print.add_argument("path", help="файл .html або .pdf")
+    p_print.add_argument("--workers", type=int, help="кількість процесів рендерингу")
+
+    p_check = sub.add_parser("check", help="перевірка цілісності банку")
+    p_check.add_argument("--repair", action="store_true", help="виправити знайдене")
+    p_check.add_argument("--salvage", help="пошкоджений JSON, з якого врятувати білети")
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    if args.command == "export":
+        export_bank(args.path, args.format, args.data)
+    elif args.command == "import":
+        try:
+            import_bank(args.path, args.format, args.data, args.on_conflict)
+        except (ConflictError, ImportFormatError) as e:
+            print(f"⚠️ {e}")
+            return 1
+    elif args.command == "print":
+        return print_bank(args.path, args.data, args.workers)
+    elif args.command == "check":
+        from integrity import format_report, run_check
+
+        report = run_check(args.data, args.repair, args.salvage)
+        print(format_report(report))
+        return 0 if report.ok or report.repaired else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
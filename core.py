@@ -0,0 +1,295 @@
+"""
+Логіка білетів без Kivy: екрани лише збирають введення і показують результат,
+а все інше робиться тут. Тому цей модуль можна профілювати й навантажувати
+без дисплея (див. benchmark.py).
+"""
+from exam_session import ExamSession, FilledIndex
+from image_store import ImageStore
+from instrumentation import get_logger
+from models import Question, pad_questions
+from scheduler import Scheduler
+from ticket_store import (
+    QUESTION_UPDATED,
+    TICKET_ADDED,
+    TICKET_REMOVED,
+    TICKET_RENAMED,
+    TicketStore,
+)
+
+QUESTIONS_PER_TICKET = 6
+
+log = get_logger(__name__)
+
+
+class TicketError(Exception):
+    """
+    Помилка, яку треба показати користувачу (текст уже українською).
+    """
+
+
+def question_display_text(q, index):
+    return q.text if q.text.strip() else f"Питання {index + 1} (не заповнено)"
+
+
+def apply_ticket_change(rows, change, make_row):
+    """
+    Вносить зміну сховища у список рядків головного екрана (RecycleView.data):
+    одна вставка, заміна чи видалення замість перебудови всього списку.
+    make_row(ticket_id) будує словник рядка.
+    """
+    if change.kind == TICKET_ADDED:
+        rows.insert(change.position, make_row(change.ticket_id))
+    elif change.kind == TICKET_RENAMED:
+        if change.old_position == change.position:
+            rows[change.position] = make_row(change.ticket_id)
+        else:
+            rows.pop(change.old_position)
+            rows.insert(change.position, make_row(change.ticket_id))
+    elif change.kind == TICKET_REMOVED:
+        rows.pop(change.old_position)
+
+
+def patch_ticket_rows(rows, version, change, make_row):
+    """
+    apply_ticket_change для списку, побудованого зі знімка сховища версії version.
+    Повертає нову версію списку або None, якщо список треба перебудувати.
+    """
+    if change.version <= version:
+        # Зміна прийшла з черги головного потоку вже після перебудови списку,
+        # яка її врахувала: позиції в ній застаріли.
+        return version
+    if change.version != version + 1:
+        # Попередня зміна ще не застосована — позиції не збігаються.
+        return None
+    apply_ticket_change(rows, change, make_row)
+    return change.version
+
+
+def apply_question_change(rows, change, make_row):
+    """
+    Оновлює один рядок на екрані запитань білета; make_row(index) будує словник.
+    Повертає False, якщо список треба побудувати заново.
+    """
+    index = change.question_index
+    if change.kind != QUESTION_UPDATED or index is None or index > len(rows):
+        return False
+    if index == len(rows):
+        rows.append(make_row(index))
+    else:
+        rows[index] = make_row(index)
+    return True
+
+
+class TicketRepository:
+    """
+    Операції над банком білетів: поверх TicketStore (дані)
+    та ImageStore (файли зображень).
+    """
+
+    def __init__(self, store=None, image_store=None, scheduler=None):
+        self.store = store if store is not None else TicketStore()
+        self.image_store = image_store if image_store is not None else ImageStore()
+        self.executor = self.store.executor
+        self._scheduler = scheduler
+
+    # --- Читання ---
+
+    def tickets(self):
+        """
+        Список (id, назва) у природному порядку назв.
+        """
+        return self.store.tickets()
+
+    def versioned_tickets(self):
+        return self.store.versioned_tickets()
+
+    def ticket_name(self, ticket_id):
+        return self.store.ticket_name(ticket_id)
+
+    def view_questions(self, ticket_id):
+        return pad_questions(self.store.get_questions(ticket_id), QUESTIONS_PER_TICKET)
+
+    def question(self, ticket_id, index):
+        questions = self.store.get_questions(ticket_id)
+        if index < len(questions):
+            return questions[index]
+        return Question.placeholder(index + 1)
+
+    def question_rows(self, ticket_id):
+        """
+        Список (індекс, текст для кнопки, чи заповнено) для екрана білета.
+        """
+        return [
+            (i, question_display_text(q, i), q.is_filled)
+            for i, q in enumerate(self.view_questions(ticket_id))
+        ]
+
+    def question_row(self, ticket_id, index):
+        q = self.question(ticket_id, index)
+        return index, question_display_text(q, index), q.is_filled
+
+    def next_question_index(self, ticket_id):
+        count = len(self.store.get_questions(ticket_id))
+        return count if count < QUESTIONS_PER_TICKET else None
+
+    def search(self, query, limit=50):
+        """
+        Список (id білета, назва білета, індекс запитання, текст запитання).
+        """
+        return [
+            (ticket_id, self.store.ticket_name(ticket_id), index, text)
+            for ticket_id, index, text in self.store.search(query, limit)
+        ]
+
+    def start_exam(self, seed=None):
+        return ExamSession(FilledIndex.from_store(self.store), seed=seed)
+
+    @property
+    def scheduler(self):
+        # Журнал повторень читається лише тоді, коли він уперше знадобився.
+        if self._scheduler is None:
+            scheduler = Scheduler().load()
+            # Картки, записані до появи id, були прив'язані до назви білета.
+            legacy = {
+                key: (self.store.find_ticket(key[0]), key[1])
+                for key in scheduler.cards
+                if not self.store.has_ticket(key[0]) and self.store.find_ticket(key[0])
+            }
+            if legacy:
+                scheduler.rekey(legacy)
+            # Заповнені запитання, яких ще немає в черзі, стають до повторення.
+            scheduler.add_cards(
+                (ticket_id, i)
+                for ticket_id, indices in self.store.filled_index().items()
+                for i in indices
+            )
+            self._scheduler = scheduler
+        return self._scheduler
+
+    def next_review(self, now=None):
+        """
+        Наступне запитання до повторення: (id білета, індекс) або None.
+        """
+        scheduler = self.scheduler
+        while True:
+            key = scheduler.next_due(now)
+            if key is None:
+                return None
+            ticket_id, index = key
+            if index in self.store.filled_index().get(ticket_id, ()):
+                return key
+            # Запитання очистили чи білет зник — картку прибираємо.
+            scheduler.cards.pop(key, None)
+
+    def review(self, ticket_id, index, quality, now=None):
+        return self.scheduler.review((ticket_id, index), quality, now)
+
+    def close(self):
+        self.store.close()
+        if self._scheduler is not None:
+            self._scheduler.compact()
+
+    def subscribe(self, listener):
+        """
+        Події змін (ticket_store.Change) — для точкового оновлення екранів.
+        """
+        self.store.subscribe(listener)
+
+    # --- Запис ---
+
+    def add_ticket(self, name, question_texts=()):
+        """
+        Повертає id нового білета.
+        """
+        name = name.strip()
+        if not name:
+            raise TicketError("Назва білета не може бути пустою!")
+        questions = [Question(text.strip()) for text in question_texts]
+        ticket_id = self.store.add_ticket(
+            name, pad_questions(questions, QUESTIONS_PER_TICKET)
+        )
+        if ticket_id is None:
+            raise TicketError("Білет з такою назвою вже існує!")
+        return ticket_id
+
+    def rename_ticket(self, ticket_id, new_name):
+        """
+        Повертає False, якщо назва не змінилася.
+        """
+        new_name = new_name.strip()
+        if not new_name:
+            raise TicketError("Нова назва не може бути пустою!")
+        if new_name == self.store.ticket_name(ticket_id):
+            return False
+        if not self.store.rename_ticket(ticket_id, new_name):
+            raise TicketError("Білет з такою назвою вже існує!")
+        return True
+
+    def delete_ticket(self, ticket_id):
+        # Картки повторень видаленого білета відсіє next_review().
+        if not self.store.remove_ticket(ticket_id):
+            raise TicketError("Білет не знайдено!")
+
+    def resolve_image(self, image_input):
+        """
+        Кладе вибране зображення у сховище і повертає шлях для збереження в даних.
+        """
+        image_input = image_input.strip()
+        if not image_input:
+            return ""
+        try:
+            return self.image_store.add(image_input)
+        except OSError as e:
+            log.warning("Помилка копіювання зображення %s: %s", image_input, e)
+            return ""
+
+    def needs_copy(self, image_input):
+        """
+        Чи доведеться копіювати зображення у сховище (тобто чи це довга операція).
+        """
+        image_input = image_input.strip()
+        return bool(image_input) and not self.image_store.is_stored(
+            self.image_store.to_absolute(image_input)
+        )
+
+    def save_question(self, ticket_id, index, text, answer_text, image_input=""):
+        question = self._write_question(ticket_id, index, text, answer_text, image_input)
+        self._track_review(ticket_id, index, question)
+        return question
+
+    def save_question_async(
+        self, ticket_id, index, text, answer_text, image_input="", on_done=None, on_error=None
+    ):
+        """
+        save_question у фоновому потоці: копіювання зображення і запис не блокують UI.
+        Збереження одного запитання виконуються по черзі, в порядку викликів.
+        Розклад повторень оновлюється в колбеці, тобто в потоці dispatch.
+        """
+
+        def done(question):
+            self._track_review(ticket_id, index, question)
+            if on_done is not None:
+                on_done(question)
+
+        return self.executor.submit(
+            self._write_question,
+            ticket_id,
+            index,
+            text,
+            answer_text,
+            image_input,
+            key=("question", ticket_id, index),
+            on_done=done,
+            on_error=on_error,
+        )
+
+    def _write_question(self, ticket_id, index, text, answer_text, image_input):
+        question = Question(
+            text.strip(), answer_text.strip(), self.resolve_image(image_input)
+        )
+        self.store.set_question(ticket_id, index, question)
+        return question
+
+    def _track_review(self, ticket_id, index, question):
+        if self._scheduler is not None and question.is_filled:
+            self._scheduler.add_cards([(ticket_id, index)])
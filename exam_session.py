@@ -0,0 +1,104 @@
+"""
+Режим пробного екзамену: білети тягнуться випадково і без повторів,
+час на кожне запитання і самооцінка записуються.
+"""
+import random
+import time
+
+
+class FilledIndex:
+    """
+    Знімок індексу заповнених запитань з TicketStore:
+    {id білета: [індекси заповнених запитань]}.
+    Сховище підтримує індекс при кожній правці, тож жеребкування
+    не переглядає запитання банку.
+    """
+
+    def __init__(self, filled):
+        self.filled = filled
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(dict(store.filled_index()))
+
+    def ticket_ids(self):
+        # Порядок словника залежить від історії правок (білет, що знову став
+        # заповненим, переходить у кінець), тож для відтворюваного seed сортуємо.
+        return sorted(self.filled)
+
+    def questions(self, ticket_id):
+        return self.filled.get(ticket_id, [])
+
+    @property
+    def question_count(self):
+        return sum(len(indices) for indices in self.filled.values())
+
+
+class ExamSession:
+    """
+    Один пробний екзамен. seed робить послідовність білетів відтворюваною.
+    """
+
+    def __init__(self, index, seed=None, clock=time.monotonic):
+        self.index = index
+        self.seed = seed
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._remaining = index.ticket_ids()
+        self._current = None
+        self._started_at = None
+        self.drawn = []
+        self.results = []
+
+    @property
+    def tickets_left(self):
+        return len(self._remaining)
+
+    def draw_ticket(self):
+        """
+        Повертає id наступного білета або None, якщо білети скінчилися.
+        O(1): випадковий елемент міняється місцями з останнім і знімається.
+        """
+        remaining = self._remaining
+        if not remaining:
+            return None
+        i = self._random.randrange(len(remaining))
+        remaining[i], remaining[-1] = remaining[-1], remaining[i]
+        ticket_id = remaining.pop()
+        self.drawn.append(ticket_id)
+        return ticket_id
+
+    def start_question(self, ticket_id, question_index):
+        self._current = (ticket_id, question_index)
+        self._started_at = self.clock()
+
+    def grade(self, correct):
+        """
+        Самооцінка поточного запитання; повертає витрачений час у секундах.
+        """
+        if self._current is None:
+            return None
+        elapsed = self.clock() - self._started_at
+        ticket_id, question_index = self._current
+        self.results.append(
+            {
+                "ticket": ticket_id,
+                "question": question_index,
+                "correct": bool(correct),
+                "seconds": round(elapsed, 1),
+            }
+        )
+        self._current = None
+        return elapsed
+
+    def summary(self):
+        answered = len(self.results)
+        correct = sum(1 for r in self.results if r["correct"])
+        total_time = sum(r["seconds"] for r in self.results)
+        return {
+            "tickets": len(self.drawn),
+            "answered": answered,
+            "correct": correct,
+            "percent": round(correct * 100 / answered) if answered else 0,
+            "avg_seconds": round(total_time / answered, 1) if answered else 0,
+        }
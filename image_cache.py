@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from instrumentation import get_logger, metrics
+from storage import THUMBNAILS_DIR
+
+log = get_logger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+THUMBNAIL_SIZE = 512
+
+_NOT_LOADED = object()
+_pil_image = _NOT_LOADED
+
+
+def pil_image():
+    """
+    Модуль PIL.Image або None, якщо Pillow не встановлено.
+    Імпортується при першій мініатюрі, а не на холодному старті застосунку.
+    """
+    global _pil_image
+    if _pil_image is _NOT_LOADED:
+        try:
+            from PIL import Image
+        except ImportError:  # Pillow необов'язковий: без нього прев'ю не зменшуються
+            Image = None
+        _pil_image = Image
+    return _pil_image
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ThumbnailCache:
+    """
+    Зменшені копії зображень у теці кешу.
+    Ключ — хеш вмісту файлу; сам хеш перераховується лише тоді,
+    коли змінився mtime або розмір файлу.
+    """
+
+    def __init__(self, cache_dir=THUMBNAILS_DIR, max_size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, path):
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def get(self, path):
+        """
+        Повертає шлях до мініатюри (створює її за потреби).
+        Без Pillow повертає оригінальний шлях.
+        Викликати з фонового потоку: тут читається і декодується файл.
+        """
+        image = pil_image()
+        if image is None:
+            return path
+        thumb_path = os.path.join(
+            self.cache_dir, f"{self._digest(path)}_{self.max_size}.png"
+        )
+        if os.path.exists(thumb_path):
+            return thumb_path
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with metrics.timer("images.thumbnail"):
+                with image.open(path) as img:
+                    img.thumbnail((self.max_size, self.max_size))
+                    tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+                    img.save(tmp_path, format="PNG")
+                os.replace(tmp_path, thumb_path)
+        except (OSError, ValueError) as e:
+            log.warning("Не вдалося створити мініатюру для %s: %s", path, e)
+            return path
+        return thumb_path
+
+
+class LRUCache:
+    """
+    LRU-кеш з обмеженням сумарного розміру елементів (наприклад, текстур у байтах).
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if key in self._items:
+            self.total -= self.sizeof(self._items.pop(key))
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._items[key] = value
+        self.total += size
+        while self.total > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.total -= self.sizeof(evicted)
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from instrumentation import configure_logging, get_logger
+from storage import APP_ROOT_DIR, IMAGES_DIR, get_backend
+
+log = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Файли, якими керує сховище: <sha256>.<розширення>
+MANAGED_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+class GarbageCollectionError(Exception):
+    pass
+
+
+def normalize_image_path(path):
+    # У старих даних трапляються шляхи з Windows: images\\file.png
+    return path.replace("\\", "/").strip()
+
+
+def image_references(data):
+    """
+    Лічильник посилань на кожне зображення в даних білетів.
+    """
+    refs = Counter()
+    for ticket in data.values():
+        for q in ticket.get("questions", []):
+            path = normalize_image_path(q.get("answer_image", ""))
+            if path:
+                refs[path] += 1
+    return refs
+
+
+class ImageStore:
+    """
+    Зображення відповідей зберігаються під іменем, що дорівнює хешу вмісту,
+    тож однакові файли лежать на диску лише один раз.
+    """
+
+    def __init__(self, images_dir=IMAGES_DIR, root_dir=APP_ROOT_DIR):
+        self.images_dir = images_dir
+        self.root_dir = root_dir
+
+    def to_relative(self, abs_path):
+        return os.path.relpath(abs_path, self.root_dir).replace(os.sep, "/")
+
+    def to_absolute(self, path):
+        path = normalize_image_path(path)
+        if os.path.isabs(path):
+            return os.path.normpath(path)
+        return os.path.normpath(os.path.join(self.root_dir, path))
+
+    def is_stored(self, abs_path):
+        return os.path.dirname(os.path.normpath(abs_path)) == os.path.normpath(
+            self.images_dir
+        )
+
+    def add(self, path):
+        """
+        Додає зображення у сховище і повертає відносний шлях для JSON.
+        Файл, що вже лежить у теці зображень, не копіюється.
+        Повертає "" якщо файл не знайдено.
+        """
+        abs_path = self.to_absolute(path)
+        if not os.path.exists(abs_path):
+            log.warning("Файл за шляхом '%s' не знайдено.", path)
+            return ""
+        if self.is_stored(abs_path):
+            return self.to_relative(abs_path)
+
+        ext = os.path.splitext(abs_path)[1].lower()
+        with open(abs_path, "rb") as src:
+            return self.add_stream(src, ext)
+
+    def add_stream(self, src, ext):
+        """
+        Зберігає вміст відкритого файлу (наприклад, з zip-архіву)
+        і повертає відносний шлях для JSON.
+        """
+        os.makedirs(self.images_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        # Хеш рахуємо під час копіювання — файл читається лише один раз.
+        fd, tmp_path = tempfile.mkstemp(dir=self.images_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            target = os.path.join(self.images_dir, digest.hexdigest() + ext.lower())
+            if os.path.exists(target):
+                os.remove(tmp_path)
+                log.info("Таке зображення вже є у сховищі: %s", self.to_relative(target))
+            else:
+                os.replace(tmp_path, target)
+                log.info("Зображення скопійовано до: %s", self.to_relative(target))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.to_relative(target)
+
+    def orphans(self, data, min_age=3600):
+        """
+        Керовані сховищем файли, на які не посилається жодне запитання.
+        Нещодавно створені файли пропускаються: їх могли додати,
+        але ще не встигнути зберегти посилання.
+        """
+        if not os.path.isdir(self.images_dir):
+            return []
+        referenced = {self.to_absolute(p) for p in image_references(data)}
+        now = time.time()
+        result = []
+        for name in os.listdir(self.images_dir):
+            # .tmp- — залишки копіювання, перерваного збоєм.
+            if not (MANAGED_NAME.match(name) or name.startswith(".tmp-")):
+                continue
+            path = os.path.join(self.images_dir, name)
+            if path in referenced:
+                continue
+            if now - os.path.getmtime(path) < min_age:
+                continue
+            result.append(path)
+        return result
+
+    def collect_garbage(self, data, dry_run=False, min_age=3600):
+        if not data:
+            # Пошкоджений або відсутній банк читається як {} — тоді кожне
+            # зображення виглядало б непотрібним.
+            raise GarbageCollectionError(
+                "Банк порожній або не прочитався; зображення не видаляються."
+            )
+        removed = []
+        for path in self.orphans(data, min_age):
+            if not dry_run:
+                os.remove(path)
+            removed.append(path)
+        action = "Знайдено" if dry_run else "Видалено"
+        log.info("%s %d зображень без посилань.", action, len(removed))
+        return removed
+
+
+if __name__ == "__main__":
+    configure_logging()
+    if sys.argv[1:2] == ["gc"]:
+        backend = get_backend()
+        try:
+            if not backend.exists():
+                raise GarbageCollectionError(
+                    "Банк білетів не знайдено; зображення не видаляються."
+                )
+            ImageStore().collect_garbage(backend.load(), dry_run="--dry-run" in sys.argv)
+        except GarbageCollectionError as e:
+            print(f"⚠️ {e}")
+            sys.exit(1)
+        finally:
+            backend.close()
+    else:
+        print("Використання: python image_store.py gc [--dry-run]")
@@ -0,0 +1,126 @@
+"""
+Журналювання і заміри продуктивності.
+
+Рівень журналу задає EXAMTICKETS_LOG_LEVEL (типово INFO).
+Заміри вмикає EXAMTICKETS_PROFILE=1: таймери навколо завантаження,
+збереження, побудови списків і зображень та лічильники записів на диск
+і створених віджетів. Наприкінці сесії звіт пишеться в cache/perf/.
+Вимкнені заміри майже нічого не коштують: timer() повертає спільний
+порожній контекст, а count() одразу виходить.
+"""
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+LOGGER_NAME = "examtickets"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def get_logger(name):
+    # Усі модулі — нащадки одного журналу, тож рівень задається в одному місці.
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level=None):
+    level = (level or os.environ.get("EXAMTICKETS_LOG_LEVEL", "INFO")).upper()
+    # Якщо обробники вже є (Kivy ставить свої), basicConfig нічого не змінює.
+    logging.basicConfig(format=LOG_FORMAT)
+    logging.getLogger(LOGGER_NAME).setLevel(level)
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Таймери і лічильники однієї сесії. Безпечні для виклику з будь-якого потоку.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # {назва: [кількість, сумарний час, найдовший]}
+        self.timings = {}
+        self.counters = Counter()
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            entry = self.timings.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+
+    def report(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "duration_s": round(time.time() - self.started, 1),
+                "timings_ms": {
+                    name: {
+                        "count": count,
+                        "total": round(total * 1000, 2),
+                        "avg": round(total * 1000 / count, 3),
+                        "max": round(longest * 1000, 3),
+                    }
+                    for name, (count, total, longest) in sorted(self.timings.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"Звіт продуктивності за {report['duration_s']} с:"]
+        for name, t in report["timings_ms"].items():
+            lines.append(
+                f"  {name:<24} {t['count']:>6} × {t['avg']:>9.3f} мс"
+                f" (макс. {t['max']:.3f}, разом {t['total']:.1f})"
+            )
+        for name, value in report["counters"].items():
+            lines.append(f"  {name:<24} {value:>6}")
+        return "\n".join(lines)
+
+    def dump(self, directory):
+        """
+        Пише звіт у JSON-файл і повертає шлях до нього.
+        """
+        from storage import atomic_write
+
+        path = os.path.join(
+            directory, time.strftime("session-%Y%m%d-%H%M%S.json", time.localtime(self.started))
+        )
+        atomic_write(path, json.dumps(self.report(), ensure_ascii=False, indent=2))
+        return path
+
+
+metrics = Metrics(enabled=bool(os.environ.get("EXAMTICKETS_PROFILE")))
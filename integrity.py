@@ -0,0 +1,319 @@
+"""
+Перевірка і ремонт банку білетів без графічного інтерфейсу.
+
+    python cli.py check
+    python cli.py check --repair
+    python cli.py check --repair --salvage data/exam_tickets_data.json.corrupt-20260101-120000
+
+Знаходить шляхи до зображень з «\\» (Windows), посилання на відсутні файли,
+файли без посилань, структурні помилки (білет без назви, однакові назви,
+запитання не того типу) і рятує цілі білети з пошкодженого JSON.
+Тека зображень переглядається один раз, запитання — теж один раз,
+тож час лінійний від розміру банку.
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+from image_store import MANAGED_NAME, ImageStore, normalize_image_path
+from instrumentation import get_logger, metrics
+from models import QUESTION_FIELDS, unique_name
+from storage import (
+    JsonFileBackend,
+    ShardedBackend,
+    assign_ticket_ids,
+    get_backend,
+    is_legacy_data,
+)
+
+log = get_logger(__name__)
+
+# Початок запису "ключ": { — на верхньому рівні значенням-об'єктом є лише білет,
+# тож після пошкодженої ділянки розбір продовжується з наступного такого місця.
+ENTRY_START = re.compile(r'"(?:[^"\\]|\\.)*"\s*:\s*\{')
+
+
+@dataclass
+class Report:
+    tickets: int = 0
+    questions: int = 0
+    images: int = 0
+    # (назва білета, номер запитання, було, стало)
+    fixed_paths: list = field(default_factory=list)
+    # (назва білета, номер запитання, шлях)
+    dangling: list = field(default_factory=list)
+    orphans: list = field(default_factory=list)
+    problems: list = field(default_factory=list)
+    # (позиція у файлі, помилка) для пошкоджених ділянок JSON
+    corrupt: list = field(default_factory=list)
+    salvaged: int = 0
+    repaired: bool = False
+
+    @property
+    def ok(self):
+        # Файли без посилань — не помилка: їх прибирає `python image_store.py gc`.
+        return not (self.fixed_paths or self.dangling or self.problems or self.corrupt)
+
+
+def salvage_tickets(text):
+    """
+    Витягує цілі білети з пошкодженого JSON-об'єкта {ключ: білет}.
+    Повертає (білети, [(позиція, помилка)]). Кожен запис розбирається окремо,
+    тож пошкодження одного білета не зачіпає решту.
+    """
+    decoder = json.JSONDecoder()
+    tickets, errors = {}, []
+    pos = text.find("{") + 1
+    if pos == 0:
+        return tickets, [(0, "у файлі немає JSON-об'єкта")]
+    while True:
+        match = ENTRY_START.search(text, pos)
+        if match is None:
+            break
+        try:
+            key, _ = decoder.raw_decode(text, match.start())
+            value, end = decoder.raw_decode(text, match.end() - 1)
+        except json.JSONDecodeError as e:
+            errors.append((e.pos, e.msg))
+            pos = match.end()
+            continue
+        tickets[key] = value
+        pos = end
+    return tickets, errors
+
+
+def read_json_bank(path):
+    """
+    Читає банк з JSON-файлу; якщо файл пошкоджений — рятує з нього що можна.
+    Повертає (дані, [(позиція, помилка)]).
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        log.warning("Файл %s пошкоджений (%s), рятуємо окремі білети.", path, e)
+        return salvage_tickets(text)
+    if not isinstance(data, dict):
+        return {}, [(0, "на верхньому рівні очікувався об'єкт")]
+    return data, []
+
+
+def index_images(image_store):
+    """
+    Абсолютні шляхи всіх файлів у теці зображень — один перегляд теки.
+    """
+    if not os.path.isdir(image_store.images_dir):
+        return set()
+    with os.scandir(image_store.images_dir) as entries:
+        return {os.path.normpath(entry.path) for entry in entries if entry.is_file()}
+
+
+def check_bank(data, image_store, repair=False):
+    """
+    Перевіряє дані {id: білет}. З repair=True виправляє їх на місці:
+    нормалізує шляхи, прибирає посилання на відсутні файли, виправляє структуру.
+    """
+    report = Report(tickets=len(data))
+    files = index_images(image_store)
+    report.images = len(files)
+    # Файли поза текою зображень перевіряються окремо, кожен один раз.
+    outside = {}
+    referenced = set()
+    names = set()
+
+    for tid, ticket in data.items():
+        if not isinstance(ticket, dict):
+            report.problems.append(f"{tid}: білет не є об'єктом")
+            if not repair:
+                continue
+            ticket = data[tid] = {"name": "", "questions": []}
+        name = ticket.get("name")
+        if not isinstance(name, str) or not name.strip():
+            report.problems.append(f"{tid}: білет без назви")
+            name = f"Білет без назви {tid[:8]}"
+            if repair:
+                ticket["name"] = name
+        if name in names:
+            new_name = unique_name(name, names.__contains__)
+            report.problems.append(f"'{name}': назва повторюється (нова назва: '{new_name}')")
+            if repair:
+                ticket["name"] = name = new_name
+        names.add(name)
+
+        # Білет без ключа questions — звичайний порожній білет ("Білет №3": {}).
+        questions = ticket.get("questions", [])
+        if not isinstance(questions, list):
+            report.problems.append(f"'{name}': запитання мають бути списком")
+            if not repair:
+                continue
+            questions = ticket["questions"] = []
+        for idx, q in enumerate(questions):
+            report.questions += 1
+            if not isinstance(q, dict):
+                report.problems.append(f"'{name}', запитання {idx + 1}: не є об'єктом")
+                if not repair:
+                    continue
+                q = questions[idx] = {}
+            for key in QUESTION_FIELDS:
+                value = q.get(key, "")
+                if not isinstance(value, str):
+                    report.problems.append(
+                        f"'{name}', запитання {idx + 1}: поле {key} не є рядком"
+                    )
+                    if repair:
+                        q[key] = "" if value is None else str(value)
+
+            raw = q.get("answer_image", "")
+            if not raw or not isinstance(raw, str):
+                continue
+            path = normalize_image_path(raw)
+            if path != raw:
+                report.fixed_paths.append((name, idx + 1, raw, path))
+                if repair:
+                    q["answer_image"] = path
+            abs_path = image_store.to_absolute(path)
+            if image_store.is_stored(abs_path):
+                exists = abs_path in files
+            else:
+                exists = outside.get(abs_path)
+                if exists is None:
+                    exists = outside[abs_path] = os.path.isfile(abs_path)
+            if exists:
+                referenced.add(abs_path)
+            else:
+                report.dangling.append((name, idx + 1, path))
+                if repair:
+                    q["answer_image"] = ""
+
+    report.orphans = sorted(
+        path
+        for path in files - referenced
+        if MANAGED_NAME.match(os.path.basename(path))
+    )
+    return report
+
+
+def backup_bank(backend):
+    """
+    Копія банку поруч з оригіналом (.bak-<час>) у будь-якому форматі.
+    Повертає шлях до копії або None, якщо банку ще немає.
+    """
+    if not backend.exists():
+        return None
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    if isinstance(backend, JsonFileBackend):
+        backup = f"{backend.path}.bak-{stamp}"
+        shutil.copy2(backend.path, backup)
+    elif isinstance(backend, ShardedBackend):
+        backup = f"{os.path.normpath(backend.root)}.bak-{stamp}"
+        shutil.copytree(backend.root, backup)
+    else:
+        # SQLite у режимі WAL: копіювати файл не можна, частина даних ще в журналі.
+        backup = f"{backend.path}.bak-{stamp}"
+        target = sqlite3.connect(backup)
+        try:
+            backend.conn.backup(target)
+        finally:
+            target.close()
+    return backup
+
+
+def run_check(data_path=None, repair=False, salvage=None, image_store=None):
+    """
+    Перевіряє банк за шляхом data_path; з repair=True спершу лишає копію банку
+    (.bak-<час>) і записує виправлені дані. salvage — пошкоджений JSON-файл,
+    білети з якого дописуються до банку, якщо їх там ще немає.
+    """
+    image_store = image_store or ImageStore()
+    # До запису виправлень банк не змінюється: старий формат переводиться
+    # лише в пам'яті, тож копія до ремонту лишається справжнім оригіналом.
+    backend = get_backend(data_path)
+    try:
+        with metrics.timer("integrity.check"):
+            corrupt = []
+            if isinstance(backend, JsonFileBackend):
+                # Читаємо самі: backend.load() пошкоджений файл мовчки замінює на {}.
+                data, corrupt = read_json_bank(backend.path) if backend.exists() else ({}, [])
+                salvaged = len(data) if corrupt else 0
+            else:
+                data, salvaged = backend.load(), 0
+            # Старі дані з ключем-назвою отримують id так само, як при звичайному читанні.
+            legacy = is_legacy_data(data)
+            if legacy:
+                data = assign_ticket_ids(data)
+
+            if salvage:
+                recovered, errors = read_json_bank(salvage)
+                corrupt.extend(errors)
+                if is_legacy_data(recovered):
+                    recovered = assign_ticket_ids(recovered)
+                present = {t.get("name") for t in data.values() if isinstance(t, dict)}
+                for tid, ticket in recovered.items():
+                    # Що вже є в банку (за id або назвою) — не чіпаємо.
+                    if not isinstance(ticket, dict) or tid in data or ticket.get("name") in present:
+                        continue
+                    data[tid] = ticket
+                    salvaged += 1
+
+            report = check_bank(data, image_store, repair)
+            report.corrupt = corrupt
+            report.salvaged = salvaged
+
+        if repair and (not report.ok or salvaged or legacy):
+            backup = backup_bank(backend)
+            if backup:
+                log.info("Копію даних до ремонту збережено в %s", backup)
+            backend.save(data)
+            report.repaired = True
+    finally:
+        backend.close()
+    return report
+
+
+def format_report(report, limit=20):
+    action = "виправлено" if report.repaired else "знайдено"
+    lines = [
+        f"Білетів: {report.tickets}, запитань: {report.questions}, "
+        f"файлів у теці зображень: {report.images}"
+    ]
+
+    def section(title, items, fmt):
+        if not items:
+            return
+        lines.append(f"{title}: {len(items)} ({action})")
+        lines.extend("  " + fmt(item) for item in items[:limit])
+        if len(items) > limit:
+            lines.append(f"  ... ще {len(items) - limit}")
+
+    if report.corrupt:
+        lines.append(
+            f"Пошкоджених ділянок JSON: {len(report.corrupt)}, врятовано білетів: {report.salvaged}"
+        )
+        lines.extend(f"  позиція {pos}: {msg}" for pos, msg in report.corrupt[:limit])
+    elif report.salvaged:
+        lines.append(f"Врятовано білетів: {report.salvaged}")
+    section(
+        "Шляхи з «\\»",
+        report.fixed_paths,
+        lambda item: f"'{item[0]}', запитання {item[1]}: {item[2]} → {item[3]}",
+    )
+    section(
+        "Посилання на відсутні зображення",
+        report.dangling,
+        lambda item: f"'{item[0]}', запитання {item[1]}: {item[2]}",
+    )
+    section("Структурні проблеми", report.problems, str)
+    if report.orphans:
+        lines.append(
+            f"Зображень без посилань: {len(report.orphans)} (прибрати: python image_store.py gc)"
+        )
+    if report.ok and not report.salvaged:
+        lines.append("Проблем не знайдено.")
+    elif not report.repaired:
+        lines.append("Виправити: python cli.py check --repair")
+    return "\n".join(lines)
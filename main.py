@@ -1,97 +1,209 @@
-from plyer import filechooser
-from functools import partial
 from kivy.app import App
 from kivy.lang import Builder
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.behaviors import ButtonBehavior
-from kivy.properties import ObjectProperty, StringProperty, BooleanProperty
+from kivy.properties import (
+    ObjectProperty,
+    StringProperty,
+    BooleanProperty,
+    NumericProperty,
+)
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
-from kivy.uix.textinput import TextInput
 from kivy.uix.image import Image
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.textinput import TextInput
+from kivy.uix.widget import Widget
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
 from kivy.core.window import Window
-from kivy.metrics import dp
+from kivy.metrics import dp, sp
 
 # --- KivyMD імпорти ---
-from kivymd.uix.button import MDIconButton
-from kivymd.uix.tooltip.tooltip import MDTooltip
+# Віджети KivyMD з examtickets.kv реєструються у Factory самою KivyMD,
+# а рідко потрібні модулі (toast, MDTextField, MDLabel, plyer)
+# імпортуються там, де використовуються, — це пришвидшує холодний старт.
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
-from kivymd.uix.button import MDRaisedButton, MDFlatButton
-from kivymd.uix.textfield import MDTextField
-from kivymd.uix.label import MDLabel
-from kivymd.toast import toast
 
 # ---------------------
-import shutil
-import json, os
+import os
+import threading
+import time
+import weakref
+
+from instrumentation import configure_logging, get_logger, metrics
+from storage import APP_ROOT_DIR, PERF_REPORT_DIR
+from core import (
+    TicketError,
+    TicketRepository,
+    apply_question_change,
+    patch_ticket_rows,
+)
+from ticket_store import TICKET_REMOVED, TICKET_RENAMED, TicketStore
+from image_cache import IMAGE_EXTENSIONS, LRUCache, ThumbnailCache
+from image_store import ImageStore, normalize_image_path
+from rich_text import estimate_height, parse_blocks, to_markup
+from workers import TaskExecutor
+
+log = get_logger(__name__)
+
+
+def get_repo():
+    return App.get_running_app().repo
+
+
+def on_main_thread(func):
+    # Події сховища можуть прийти з фонового потоку, а віджети чіпати — лише з головного.
+    def wrapper(*args):
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            Clock.schedule_once(lambda dt: func(*args))
 
-# Визначаємо шлях до кореня програми ОДИН РАЗ, при старті
-# Це гарантує, що ми завжди знаємо, де знаходиться корінь, незалежно від CWD.
-APP_ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(APP_ROOT_DIR, "data", "exam_tickets_data.json")
-IMAGES_DIR = os.path.join(APP_ROOT_DIR, "images")
+    return wrapper
 
 
-def load_data():
-    if os.path.exists(DATA_PATH):
-        try:
-            with open(DATA_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Помилка читання JSON з {DATA_PATH}. Повертаємо порожні дані.")
-            return {}
-    return {}
-
-
-def save_data(data):
-    os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-
-def generate_initial_data():
-    if not os.path.exists(DATA_PATH):
-        initial_data = {}
-        for i in range(1, 26):
-            ticket_name = f"Білет {i}"
-            questions = []
-            for j in range(1, 7):
-                questions.append(
-                    {"text": f"Запитання {j}", "answer_text": "", "answer_image": ""}
-                )
-            initial_data[ticket_name] = {"questions": questions}
-        save_data(initial_data)
-        print("Згенеровано початкові 25 білетів.")
+_thumbnail_cache = None
+_preview_textures = None
+_answer_textures = None
 
 
-class HoverEditButton(ButtonBehavior, Image):
-    tooltip_text = StringProperty("Редагувати")
-    tooltip_label = ObjectProperty(None, allownone=True)
-    is_hovering = BooleanProperty(False)
+def get_thumbnail_cache():
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.source = "images/icon_edit.png"  # Переконайтеся, що цей шлях правильний
-        self.size_hint_x = None
-        self.width = dp(40)
-        self.fit_mode = "contain"
+
+def get_preview_textures():
+    # Не більше ~64 МБ текстур прев'ю у відеопам'яті.
+    global _preview_textures
+    if _preview_textures is None:
+        _preview_textures = LRUCache(
+            64 * 1024 * 1024, lambda texture: texture.width * texture.height * 4
+        )
+    return _preview_textures
+
+
+def get_answer_textures():
+    # Блоки відповідей, що вже були на екрані: повторне гортання не рендерить їх знову.
+    global _answer_textures
+    if _answer_textures is None:
+        _answer_textures = LRUCache(
+            32 * 1024 * 1024, lambda texture: texture.width * texture.height * 4
+        )
+    return _answer_textures
+
+
+class HoverManager:
+    """
+    Одна прив'язка до Window.mouse_pos на весь застосунок.
+    Віджети реєструються самі, а перевірка наведення на кожен рух миші
+    робиться лише для віджетів у смузі під курсором.
+    """
+
+    BUCKET_HEIGHT = dp(50)
+    # Прокрутка ScrollView не змінює pos віджетів, тому при промаху
+    # індекс перебудовується, але не частіше за цей інтервал.
+    REBUILD_INTERVAL = 0.1
+
+    def __init__(self):
+        # WeakSet: прибрані з дерева віджети не утримуються менеджером.
+        self._widgets = weakref.WeakSet()
+        self._buckets = {}
+        self._index_dirty = True
+        self._last_rebuild = 0
+        self._hovered = None
+        self._tooltip = None
         Window.bind(mouse_pos=self.on_mouse_pos)
 
+    def register(self, widget):
+        if widget in self._widgets:
+            return
+        self._widgets.add(widget)
+        widget.bind(pos=self.invalidate, size=self.invalidate)
+        self.invalidate()
+
+    def unregister(self, widget):
+        if widget not in self._widgets:
+            return
+        self._widgets.discard(widget)
+        widget.unbind(pos=self.invalidate, size=self.invalidate)
+        if self._hovered is widget:
+            self._leave()
+        self.invalidate()
+
+    def invalidate(self, *args):
+        self._index_dirty = True
+
+    def _window_rect(self, widget):
+        x, y = widget.to_window(widget.x, widget.y)
+        return x, y, x + widget.width, y + widget.height
+
+    def _rebuild_index(self):
+        buckets = {}
+        for widget in self._widgets:
+            if widget.get_root_window() is None:
+                continue
+            x1, y1, x2, y2 = self._window_rect(widget)
+            for row in range(int(y1 // self.BUCKET_HEIGHT), int(y2 // self.BUCKET_HEIGHT) + 1):
+                buckets.setdefault(row, []).append(widget)
+        self._buckets = buckets
+        self._index_dirty = False
+        self._last_rebuild = time.monotonic()
+
+    def _hit(self, widget, pos):
+        if widget.get_root_window() is None or widget.opacity == 0:
+            return False
+        x1, y1, x2, y2 = self._window_rect(widget)
+        return x1 <= pos[0] <= x2 and y1 <= pos[1] <= y2
+
     def on_mouse_pos(self, window, pos):
-        if self.collide_point(*pos):
-            if not self.is_hovering:
-                self.is_hovering = True
-                self.on_enter()
-        else:
-            if self.is_hovering:
-                self.is_hovering = False
-                self.on_leave()
-
-    def on_enter(self):
-        if not self.tooltip_label:
-            self.tooltip_label = MDLabel(
-                text=self.tooltip_text,
+        hovered = self._hovered
+        if hovered is not None and self._hit(hovered, pos):
+            return
+        if hovered is not None:
+            self._leave()
+        if self._index_dirty:
+            self._rebuild_index()
+        widget = self._find(pos)
+        if widget is None and time.monotonic() - self._last_rebuild > self.REBUILD_INTERVAL:
+            self._rebuild_index()
+            widget = self._find(pos)
+        if widget is not None:
+            self._enter(widget)
+
+    def _find(self, pos):
+        for widget in self._buckets.get(int(pos[1] // self.BUCKET_HEIGHT), ()):
+            if self._hit(widget, pos):
+                return widget
+        return None
+
+    def _enter(self, widget):
+        self._hovered = widget
+        widget.is_hovering = True
+        tooltip = self._get_tooltip()
+        tooltip.text = widget.tooltip_text
+        if tooltip.parent is None:
+            Window.add_widget(tooltip)
+        tooltip.texture_update()
+        x1, y1, x2, y2 = self._window_rect(widget)
+        tooltip.pos = ((x1 + x2) / 2 - tooltip.width / 2, y2 + dp(5))
+
+    def _leave(self):
+        if self._hovered is not None:
+            self._hovered.is_hovering = False
+            self._hovered = None
+        if self._tooltip is not None and self._tooltip.parent is not None:
+            Window.remove_widget(self._tooltip)
+
+    def _get_tooltip(self):
+        # Одна підказка на весь застосунок замість нового MDLabel на кожне наведення.
+        if self._tooltip is None:
+            from kivymd.uix.label import MDLabel
+
+            self._tooltip = MDLabel(
                 size_hint=(None, None),
                 height=dp(30),
                 padding=[dp(10), dp(5)],
@@ -100,171 +212,207 @@ class HoverEditButton(ButtonBehavior, Image):
                 halign="center",
                 valign="middle",
             )
-            self.tooltip_label.bind(texture_size=self.tooltip_label.setter("size"))
-            Window.add_widget(self.tooltip_label)
-            self.tooltip_label.md_bg_color = (0.1, 0.1, 0.1, 0.8)
-            self.update_tooltip_pos()
-
-    def on_leave(self):
-        if self.tooltip_label:
-            Window.remove_widget(self.tooltip_label)
-            self.tooltip_label = None
-
-    def update_tooltip_pos(self):
-        if self.tooltip_label:
-            self.tooltip_label.pos = (
-                self.x + self.width / 2 - self.tooltip_label.width / 2,
-                self.top + dp(5),
-            )
+            self._tooltip.bind(texture_size=self._tooltip.setter("size"))
+            self._tooltip.md_bg_color = (0.1, 0.1, 0.1, 0.8)
+        return self._tooltip
+
 
-    def on_pos(self, instance, value):
-        self.update_tooltip_pos()
+_hover_manager = None
 
-    def on_size(self, instance, value):
-        self.update_tooltip_pos()
+
+def get_hover_manager():
+    global _hover_manager
+    if _hover_manager is None:
+        _hover_manager = HoverManager()
+    return _hover_manager
+
+
+class HoverEditButton(ButtonBehavior, Image):
+    tooltip_text = StringProperty("Редагувати")
+    is_hovering = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.source = "images/icon_edit.png"  # Переконайтеся, що цей шлях правильний
+        self.size_hint_x = None
+        self.width = dp(40)
+        self.fit_mode = "contain"
+        get_hover_manager().register(self)
+        metrics.count("widgets.HoverEditButton")
+
+    def on_parent(self, instance, parent):
+        if parent is None:
+            get_hover_manager().unregister(self)
+        else:
+            get_hover_manager().register(self)
 
 
 class EditQuestionScreen(MDScreen):
-    ticket_name = StringProperty("")
+    ticket_id = StringProperty("")
     question_index = ObjectProperty(None)
+    _answer_editor = None
 
     def load_question_data(self):
-        data = load_data()
-        ticket = data.get(self.ticket_name, {})
-        questions = ticket.get("questions", [])
-
-        if self.question_index < len(questions):
-            q = questions[self.question_index]
-            self.ids.question_text_input.text = q.get("text", "")
-            self.ids.answer_text_input.text = q.get("answer_text", "")
-            image_path_from_data = q.get("answer_image", "")
-            self.ids.image_path_input.text = image_path_from_data
-        else:
-            self.ids.question_text_input.text = f"Запитання {self.question_index + 1}"
-            self.ids.answer_text_input.text = ""
-            image_path_from_data = ""
-            self.ids.image_path_input.text = ""
+        q = get_repo().question(self.ticket_id, self.question_index)
+        self.ids.question_text_input.text = q.text
+        self._answer_text = q.answer_text
+        self.close_answer_editor()
+        self.ids.answer_view.text = q.answer_text
+        image_path_from_data = q.answer_image
+        self.ids.image_path_input.text = image_path_from_data
 
         self.update_image_preview(image_path_from_data)
 
     def save_question(self):
-        question = self.ids.question_text_input.text.strip()
-        answer = self.ids.answer_text_input.text.strip()
-        current_image_path_in_input = self.ids.image_path_input.text.strip()
-        final_image_path_to_save = ""
-
-        if current_image_path_in_input:
-            os.makedirs(IMAGES_DIR, exist_ok=True)  # Використовуємо глобальну IMAGES_DIR
-
-            image_name = os.path.basename(current_image_path_in_input)
-            target_local_path_relative = os.path.join("images", image_name)  # Відносний шлях для JSON
-            target_local_path_absolute = os.path.join(
-                IMAGES_DIR, image_name
-            )  # Абсолютний шлях для копіювання
-
-            abs_current_path = os.path.abspath(current_image_path_in_input)
-
-            if os.path.exists(abs_current_path):
-                # Перевіряємо, чи файл вже знаходиться у нашій локальній папці 'images'
-                if os.path.normpath(abs_current_path) != os.path.normpath(
-                    target_local_path_absolute
-                ):
-                    try:
-                        shutil.copy(
-                            abs_current_path, target_local_path_absolute
-                        )  # Копіюємо до абсолютного шляху
-                        final_image_path_to_save = (
-                            target_local_path_relative  # Зберігаємо відносний шлях у JSON
-                        )
-                        print(f"🖼️ Зображення скопійовано до: {final_image_path_to_save}")
-                    except Exception as e:
-                        print(
-                            f"⚠️ Помилка копіювання зображення {abs_current_path} до {target_local_path_absolute}: {e}"
-                        )
-                        final_image_path_to_save = ""
-                else:
-                    final_image_path_to_save = target_local_path_relative
-                    print(
-                        f"🖼️ Зображення вже знаходиться в локальній папці: {final_image_path_to_save}"
-                    )
-            else:
-                print(f"⚠️ Файл за шляхом '{current_image_path_in_input}' не знайдено.")
-                final_image_path_to_save = ""
-
-        data = load_data()
-        ticket = data.get(self.ticket_name, {})
-        questions = ticket.get("questions", [])
-
-        while len(questions) <= self.question_index:
-            questions.append({"text": "", "answer_text": "", "answer_image": ""})
+        # Сховище зображень саме вирішує, чи треба копіювати: файл, що вже є
+        # у теці images, повторно не копіюється, а однакові — не дублюються.
+        # Копіювання і запис ідуть у фоні, тож екран закривається одразу.
+        from kivymd.toast import toast
+
+        repo = get_repo()
+        ticket_id, index = self.ticket_id, self.question_index
+        image_input = self.ids.image_path_input.text
+        if repo.needs_copy(image_input):
+            toast("Копіювання зображення...")
+
+        def saved(question):
+            log.info(
+                "Запитання %d білета '%s' збережено.", index + 1, repo.ticket_name(ticket_id)
+            )
+            toast("✅ Запитання збережено")
+
+        def failed(error):
+            log.error("Не вдалося зберегти запитання %d: %s", index + 1, error)
+            toast(f"⚠️ Не вдалося зберегти запитання: {error}")
+
+        repo.save_question_async(
+            ticket_id,
+            index,
+            self.ids.question_text_input.text,
+            self.answer_text(),
+            image_input,
+            on_done=saved,
+            on_error=failed,
+        )
+        # Рядок запитання на екрані білета оновить подія сховища.
+        self.manager.current = "ticket_questions_screen"
 
-        questions[self.question_index] = {
-            "text": question,
-            "answer_text": answer,
-            "answer_image": final_image_path_to_save,
-        }
+    def answer_text(self):
+        if self._answer_editor is not None:
+            return self._answer_editor.text
+        return self._answer_text
 
-        ticket["questions"] = questions
-        data[self.ticket_name] = ticket
-        save_data(data)
-        print(
-            f"✅ Запитання {self.question_index + 1} білета '{self.ticket_name}' збережено!"
+    def toggle_answer_editor(self):
+        """
+        Поле редагування відповіді створюється лише на вимогу: довгий текст
+        у полі вводу розкладається повільно і гальмує клавіатуру.
+        """
+        if self._answer_editor is None:
+            self.open_answer_editor()
+        else:
+            self._answer_text = self._answer_editor.text
+            self.close_answer_editor()
+            self.ids.answer_view.text = self._answer_text
+
+    def open_answer_editor(self):
+        self._answer_editor = TextInput(
+            text=self._answer_text,
+            hint_text="Відповідь у Markdown: # заголовок, **жирний**, - список, | таблиця |",
         )
-
-        self.manager.get_screen("ticket_questions_screen").set_ticket(self.ticket_name)
-        self.manager.current = "ticket_questions_screen"
+        view = self.ids.answer_view
+        view.opacity, view.size_hint_y, view.height = 0, None, 0
+        # Над кнопкою перемикання (діти BoxLayout зберігаються у зворотному порядку).
+        self.ids.answer_box.add_widget(self._answer_editor, index=1)
+        self.ids.answer_mode_button.text = "Переглянути відповідь"
+
+    def close_answer_editor(self):
+        if self._answer_editor is None:
+            return
+        self.ids.answer_box.remove_widget(self._answer_editor)
+        self._answer_editor = None
+        view = self.ids.answer_view
+        view.opacity, view.size_hint_y = 1, 1
+        self.ids.answer_mode_button.text = "Редагувати відповідь"
 
     def update_image_preview(self, path_to_display):
+        # Кожен виклик отримує свій номер: результат застарілого
+        # фонового завантаження (користувач вже перейшов далі) ігнорується.
+        self._preview_request = getattr(self, "_preview_request", 0) + 1
+        request = self._preview_request
+
         if not path_to_display:
-            self.ids.image_preview.source = ""
-            self.ids.image_preview.opacity = 0
-            print(f"🚫 Прев'ю зображення очищено. Шлях пустий.")
-            self.ids.image_preview.reload()
+            self.show_preview_texture(None)
+            log.debug("Прев'ю зображення очищено: шлях порожній.")
             return
 
         # Завжди будуємо абсолютний шлях до файлу на основі APP_ROOT_DIR
-        actual_file_path = path_to_display
-        if not os.path.isabs(path_to_display):
-            actual_file_path = os.path.join(APP_ROOT_DIR, path_to_display)
+        actual_file_path = normalize_image_path(path_to_display)
+        if not os.path.isabs(actual_file_path):
+            actual_file_path = os.path.join(APP_ROOT_DIR, actual_file_path)
 
         actual_file_path = os.path.normpath(actual_file_path)
 
-        print(f"DEBUG: Поточна директорія: {os.getcwd()}")  # Залишаємо для налагодження CWD
-        print(f"DEBUG: Шлях для перевірки існування: '{actual_file_path}'")
-        print(f"DEBUG: Шлях, що передається в Kivy Image: '{path_to_display}' (оригінал з JSON або filechooser)")
+        if not actual_file_path.lower().endswith(IMAGE_EXTENSIONS):
+            self.show_preview_texture(None)
+            return
+
+        texture = get_preview_textures().get(actual_file_path)
+        if texture is not None:
+            # Текстура вже в пам'яті — показуємо одразу, без фонового потоку.
+            self.show_preview_texture(texture)
+            return
 
+        get_repo().executor.submit(
+            self._prepare_preview,
+            actual_file_path,
+            path_to_display,
+            on_done=lambda thumb_path: self._apply_preview(actual_file_path, thumb_path, request),
+        )
 
-        if (
-            "image_preview" in self.ids
-            and os.path.exists(actual_file_path)
-            and actual_file_path.lower().endswith(
-                (".png", ".jpg", ".jpeg", ".gif", ".bmp")
-            )
-        ):
-            # Для Kivy Image.source безпечніше використовувати абсолютний шлях,
-            # якщо є підозри на проблеми з відносними шляхами та CWD.
-            self.ids.image_preview.source = actual_file_path
-            self.ids.image_preview.opacity = 1
-            print(f"🖼️ Прев'ю зображення оновлено: {actual_file_path} (використано для source)")
-        else:
-            self.ids.image_preview.source = ""
-            self.ids.image_preview.opacity = 0
-            print(
-                f"🚫 Прев'ю зображення очищено. Шлях '{path_to_display}' (абсолютний: '{actual_file_path}') недійсний або файл не знайдено."
+    def _prepare_preview(self, actual_file_path, path_to_display):
+        # Працює у фоновому потоці: перевірка файлу і створення мініатюри.
+        if not os.path.exists(actual_file_path):
+            log.warning(
+                "Файл зображення '%s' не знайдено (абсолютний шлях: '%s').",
+                path_to_display,
+                actual_file_path,
             )
+            return None
+        return get_thumbnail_cache().get(actual_file_path)
+
+    def _apply_preview(self, actual_file_path, thumb_path, request):
+        if request != self._preview_request:
+            return
+        if thumb_path is None:
+            self.show_preview_texture(None)
+            return
+        # Текстури можна створювати лише в головному потоці (OpenGL).
+        from kivy.core.image import Image as CoreImage
+
+        try:
+            with metrics.timer("images.texture"):
+                texture = CoreImage(thumb_path).texture
+        except Exception as e:
+            log.warning("Не вдалося завантажити прев'ю %s: %s", thumb_path, e)
+            self.show_preview_texture(None)
+            return
+        get_preview_textures().put(actual_file_path, texture)
+        self.show_preview_texture(texture)
+        log.debug("Прев'ю зображення оновлено: %s", actual_file_path)
 
-        self.ids.image_preview.reload()
+    def show_preview_texture(self, texture):
+        self.ids.image_preview.texture = texture
+        self.ids.image_preview.opacity = 1 if texture is not None else 0
 
     def open_image_picker(self):
         try:
+            from plyer import filechooser
+
             path_selection = filechooser.open_file(
                 title="Виберіть зображення для відповіді",
                 filters=[("Зображення", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp")],
                 multiple=False,
             )
-            
-            # Додайте цей рядок для налагодження CWD ПІСЛЯ filechooser
-            print(f"DEBUG: CWD після filechooser: {os.getcwd()}")
 
             if path_selection and len(path_selection) > 0:
                 selected_image_abs_path = path_selection[0]
@@ -275,125 +423,279 @@ class EditQuestionScreen(MDScreen):
                     selected_image_abs_path
                 )  # Оновлюємо прев'ю з абсолютним шляхом
             else:
-                print("Вибір зображення скасовано або файл не вибрано.")
+                log.debug("Вибір зображення скасовано або файл не вибрано.")
         except Exception as e:
-            print(f"Помилка при відкритті вибору файлів: {e}")
+            log.warning("Помилка при відкритті вибору файлів: %s", e)
 
     def go_back(self):
         self.manager.current = "ticket_questions_screen"
 
     def on_enter(self, *args):
         self.load_question_data()
-        print("🧠 EditQuestionScreen loaded")
 
     def delete_image(self):
         """
-        Видаляє зображення, якщо шлях вказано і файл існує.
+        Відкріплює зображення від запитання.
+        Сам файл може використовуватися іншими запитаннями, тому не видаляється:
+        файли без посилань прибирає `python image_store.py gc`.
         """
+        from kivymd.toast import toast
+
         current_path = self.ids.image_path_input.text.strip()
 
         if not current_path:
             toast("⚠️ Шлях до зображення не вказано")
             return
 
-        # Визначаємо абсолютний шлях
-        abs_path = current_path if os.path.isabs(current_path) else os.path.join(
-            App.get_running_app().root_dir, current_path
-        )
+        # Очищення поля та прев’ю; зміна запишеться після «Зберегти»
+        self.ids.image_path_input.text = ""
+        self.update_image_preview("")
+        toast("✅ Зображення відкріплено від запитання")
 
-        # Перевірка на існування файлу
-        if not os.path.exists(abs_path):
-            toast("⚠️ Файл не знайдено")
-            return
 
-        # Спроба видалити
-        try:
-            os.remove(abs_path)
-            toast("✅ Зображення успішно видалено")
-        except Exception as e:
-            toast(f"⚠️ Помилка при видаленні: {e}")
-            return
+# --- Рядки RecycleView: існують лише для видимих елементів списку ---
 
-        # Очищення поля та прев’ю
-        self.ids.image_path_input.text = ""
-        self.update_image_preview("")
 
+class CountedWidget:
+    """
+    Домішка для замірів: рахує створені віджети кожного класу.
+    """
+
+    def __init__(self, **kwargs):
+        metrics.count(f"widgets.{type(self).__name__}")
+        super().__init__(**kwargs)
+
+
+class TicketRow(CountedWidget, BoxLayout):
+    screen = ObjectProperty(None, allownone=True)
+    ticket_id = StringProperty("")
+    name = StringProperty("")
+
+
+class SearchResultRow(CountedWidget, BoxLayout):
+    screen = ObjectProperty(None, allownone=True)
+    ticket_id = StringProperty("")
+    question_index = NumericProperty(0)
+    text = StringProperty("")
+
+
+class QuestionRow(CountedWidget, BoxLayout):
+    screen = ObjectProperty(None, allownone=True)
+    question_index = NumericProperty(0)
+    text = StringProperty("")
+    filled = BooleanProperty(False)
+
+
+class AnswerBlock(CountedWidget, RecycleDataViewBehavior, Widget):
+    """
+    Один блок відповіді: малює готову текстуру з кешу, а не тримає власну мітку.
+    """
+
+    block = ObjectProperty(None, allownone=True)
+    texture = ObjectProperty(None, allownone=True)
+
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        self.texture = rv.block_texture(data["block"])
+        height = self.texture.height if self.texture is not None else 0
+        if abs(height - data["height"]) > 1:
+            rv.correct_height(index, data["block"], height)
+
+
+class AnswerView(RecycleView):
+    """
+    Відповідь у Markdown лише для читання. Текстури створюються тільки для
+    блоків, що потрапили на екран; висота решти поки лише оцінена.
+    """
+
+    text = StringProperty("")
+    font_size = NumericProperty(sp(15))
+
+    def __init__(self, **kwargs):
+        self._blocks = []
+        super().__init__(**kwargs)
+        self._relayout = Clock.create_trigger(lambda dt: self.show_blocks())
+
+    def on_text(self, instance, text):
+        self._blocks = parse_blocks(text)
+        self.show_blocks()
+        self.scroll_y = 1
+
+    def on_width(self, instance, width):
+        self._relayout()
+
+    def text_width(self):
+        return int(max(self.width - dp(16), dp(50)))
+
+    def show_blocks(self):
+        width = self.text_width()
+        self.data = [
+            {"block": block, "height": estimate_height(block, width, self.font_size)}
+            for block in self._blocks
+        ]
+
+    def block_texture(self, block):
+        width = self.text_width()
+        key = (block, width, self.font_size)
+        textures = get_answer_textures()
+        texture = textures.get(key)
+        if texture is None:
+            with metrics.timer("ui.answer_block"):
+                label = CoreLabel(
+                    text=to_markup(block, self.font_size),
+                    markup=True,
+                    font_size=self.font_size,
+                    text_size=(width, None),
+                    color=(0.1, 0.1, 0.1, 1),
+                )
+                label.refresh()
+                texture = label.texture
+            if texture is not None:
+                textures.put(key, texture)
+        return texture
+
+    def correct_height(self, index, block, height):
+        # Оцінку замінюємо справжньою висотою вже після поточної розкладки.
+        def apply(dt):
+            if index < len(self.data) and self.data[index]["block"] is block:
+                self.data[index] = {"block": block, "height": height}
+
+        Clock.schedule_once(apply)
 
 
 class MainScreen(Screen):
-    tickets_list_layout = ObjectProperty(None)
+    # Що зараз у списку: "tickets", "search" або None (ще нічого).
+    _showing = None
+    # Версія сховища, до якої список білетів уже оновлено.
+    _version = 0
+    # Пауза в наборі, після якої запускається пошук (с).
+    SEARCH_DELAY = 0.3
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        get_repo().subscribe(on_main_thread(self.on_store_change))
+        self._search_trigger = Clock.create_trigger(
+            lambda dt: self.search_tickets(self.ids.search_input.text), self.SEARCH_DELAY
+        )
+
+    def schedule_search(self, *args):
+        # Не на кожен символ: для SQLite пошук спершу скидає правки на диск.
+        self._search_trigger()
 
     def on_enter(self, *args):
-        self.load_tickets()
+        query = self.ids.search_input.text.strip()
+        if query:
+            self.search_tickets(query)
+        elif self._showing != "tickets":
+            self.load_tickets()
+
+    def on_store_change(self, change):
+        if self._showing != "tickets":
+            # Результати пошуку оновляться при наступному вході на екран.
+            return
+        repo = get_repo()
+        version = patch_ticket_rows(
+            self.ids.tickets_list.data,
+            self._version,
+            change,
+            lambda ticket_id: self.ticket_row_data(ticket_id, repo.ticket_name(ticket_id)),
+        )
+        if version is None:
+            self.load_tickets()
+        else:
+            self._version = version
 
     def load_tickets(self):
-        self.tickets_list_layout.clear_widgets()
-        data = load_data()
-        if not data:
-            generate_initial_data()
-            data = load_data()
-
-        for name in sorted(data.keys()):
-            self.add_ticket_widget(name)
-
-    def add_ticket_widget(self, name):
-        layout = BoxLayout(
-            orientation="horizontal",
-            size_hint_y=None,
-            height=dp(50),
-            spacing=dp(10),
-            padding=[dp(5), 0],
-        )
+        if not get_repo().store.is_loaded:
+            # Дані ще читаються у фоні — список заповнить ExamTicketsApp.on_data_loaded.
+            return
+        # Порядок підтримує сховище — тут список лише перетворюється на рядки.
+        with metrics.timer("ui.ticket_list"):
+            self._version, tickets = get_repo().versioned_tickets()
+            self.ids.tickets_list.data = [
+                self.ticket_row_data(ticket_id, name) for ticket_id, name in tickets
+            ]
+        self._showing = "tickets"
+
+    def ticket_row_data(self, ticket_id, name):
+        return {
+            "viewclass": "TicketRow",
+            "screen": self,
+            "ticket_id": ticket_id,
+            "name": name,
+        }
 
-        btn = MDRaisedButton(
-            text=name,
-            size_hint_x=0.8,
-            on_release=lambda x, n=name: self.view_ticket_questions(n),
+    def search_tickets(self, query):
+        query = query.strip()
+        if not query:
+            self.load_tickets()
+            return
+
+        repo = get_repo()
+        # Запис незбережених правок і запит до індексу — у фоновому потоці.
+        repo.executor.submit(
+            repo.search,
+            query,
+            key="search",
+            on_done=lambda results: self.show_search_results(query, results),
         )
 
-        edit_icon = HoverEditButton(tooltip_text="Редагувати")
-        edit_icon.bind(on_release=lambda x, n=name: self.edit_ticket_prompt(n))
+    def show_search_results(self, query, results):
+        if query != self.ids.search_input.text.strip():
+            # Поки шукали, запит змінився — ці результати вже не потрібні.
+            return
+        with metrics.timer("ui.search"):
+            self.ids.tickets_list.data = [
+                {
+                    "viewclass": "SearchResultRow",
+                    "screen": self,
+                    "ticket_id": ticket_id,
+                    "question_index": index,
+                    "text": f"{name}: {text or f'Питання {index + 1}'}",
+                }
+                for ticket_id, name, index, text in results
+            ]
+        self._showing = "search"
 
-        layout.add_widget(btn)
-        layout.add_widget(edit_icon)
-        self.tickets_list_layout.add_widget(layout)
+    def open_question(self, ticket_id, index):
+        self.manager.get_screen("ticket_questions_screen").set_ticket(ticket_id)
+        screen = self.manager.get_screen("edit_question_screen")
+        screen.ticket_id = ticket_id
+        screen.question_index = index
+        self.manager.current = "edit_question_screen"
 
-    def view_ticket_questions(self, ticket_name):
-        self.manager.get_screen("ticket_questions_screen").set_ticket(ticket_name)
+    def view_ticket_questions(self, ticket_id):
+        self.manager.get_screen("ticket_questions_screen").set_ticket(ticket_id)
         self.manager.current = "ticket_questions_screen"
 
-    def edit_ticket_prompt(self, ticket_name):
-        self.manager.get_screen("edit_ticket_screen").set_ticket(ticket_name)
+    def edit_ticket_prompt(self, ticket_id):
+        self.manager.get_screen("edit_ticket_screen").set_ticket(ticket_id)
         self.manager.current = "edit_ticket_screen"
 
 
 class EditTicketScreen(MDScreen):
+    ticket_id = StringProperty("")
     old_name = StringProperty("")
 
-    def set_ticket(self, old_name):
-        self.old_name = old_name
-        self.ids.new_ticket_name_input.text = old_name
+    def set_ticket(self, ticket_id):
+        self.ticket_id = ticket_id
+        self.old_name = get_repo().ticket_name(ticket_id)
+        self.ids.new_ticket_name_input.text = self.old_name
 
     def save_changes(self):
         new_name = self.ids.new_ticket_name_input.text.strip()
-        if not new_name:
-            print("Нова назва не може бути пустою!")
+        try:
+            renamed = get_repo().rename_ticket(self.ticket_id, new_name)
+        except TicketError as e:
+            log.warning("%s", e)
             return
 
-        data = load_data()
-        if new_name == self.old_name:
-            print("Назва не змінена.")
+        if not renamed:
+            log.info("Назва не змінена.")
             self.manager.current = "main_screen"
             return
 
-        if new_name in data:
-            print("Білет з такою назвою вже існує!")
-            return
-
-        data[new_name] = data.pop(self.old_name)
-        save_data(data)
-        print(f"Білет '{self.old_name}' перейменовано на '{new_name}'.")
-        self.manager.get_screen("main_screen").load_tickets()
+        log.info("Білет '%s' перейменовано на '%s'.", self.old_name, new_name)
         self.manager.current = "main_screen"
 
     def go_back(self):
@@ -405,6 +707,8 @@ class AddTicketScreen(MDScreen):
     questions_inputs = ObjectProperty(None)
 
     def on_enter(self, *args):
+        from kivymd.uix.textfield import MDTextField
+
         self.ids.ticket_name_input.text = ""
         self.questions_inputs.clear_widgets()
         for i in range(6):
@@ -414,131 +718,227 @@ class AddTicketScreen(MDScreen):
             self.questions_inputs.add_widget(ti)
 
     def save_ticket(self):
-        name = self.ids.ticket_name_input.text.strip()
-        if not name:
-            print("Назва білета не може бути пустою!")
-            return
-
-        data = load_data()
-        if name in data:
-            print("Білет з такою назвою вже існує!")
-            return
-
-        questions = []
-        for widget in self.questions_inputs.children[::-1]:
-            if isinstance(widget, MDTextField):
-                text = widget.text.strip()
-                questions.append({"text": text, "answer_text": "", "answer_image": ""})
-
-        while len(questions) < 6:
-            questions.append(
-                {
-                    "text": f"Запитання {len(questions) + 1}",
-                    "answer_text": "",
-                    "answer_image": "",
-                }
+        question_texts = [
+            widget.text
+            for widget in self.questions_inputs.children[::-1]
+            if isinstance(widget, TextInput)
+        ]
+        try:
+            ticket_id = get_repo().add_ticket(
+                self.ids.ticket_name_input.text, question_texts
             )
+        except TicketError as e:
+            log.warning("%s", e)
+            return
 
-        data[name] = {"questions": questions}
-        save_data(data)
-        print(f"Білет '{name}' збережено!")
-        self.manager.get_screen("main_screen").load_tickets()
+        log.info("Білет '%s' збережено.", get_repo().ticket_name(ticket_id))
         self.ids.ticket_name_input.text = ""
         self.manager.current = "main_screen"
 
 
 class TicketQuestionsScreen(Screen):
-    ticket_name = StringProperty("")
+    ticket_id = StringProperty("")
 
-    def on_enter(self, *args):
-        if self.ticket_name:
-            self.load_questions()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        get_repo().subscribe(on_main_thread(self.on_store_change))
 
-    def set_ticket(self, ticket_name):
-        self.ticket_name = ticket_name
-        self.ids.ticket_title.text = f"[b]{ticket_name}[/b]"
+    def set_ticket(self, ticket_id):
+        self.ticket_id = ticket_id
+        self.ids.ticket_title.text = f"[b]{get_repo().ticket_name(ticket_id)}[/b]"
         self.load_questions()
 
     def load_questions(self):
-        self.ids.questions_list.clear_widgets()
-        data = load_data()
-        ticket = data.get(self.ticket_name, {})
-        questions = ticket.get("questions", [])
-
-        while len(questions) < 6:
-            questions.append(
-                {
-                    "text": f"Запитання {len(questions) + 1}",
-                    "answer_text": "",
-                    "answer_image": "",
-                }
-            )
-
-        ticket["questions"] = questions
-        data[self.ticket_name] = ticket
-        save_data(data)
-
-        for i, q_data in enumerate(questions):
-            question_text = q_data.get("text", "")
-            answer_text = q_data.get("answer_text", "")
-            answer_image = q_data.get("answer_image", "")
-
-            filled = bool(
-                question_text.strip() or answer_text.strip() or answer_image.strip()
-            )
-
-            q_display_text = (
-                question_text
-                if question_text.strip()
-                else f"Питання {i+1} (не заповнено)"
-            )
+        with metrics.timer("ui.question_list"):
+            self.ids.questions_list.data = [
+                self.row_data(*row) for row in get_repo().question_rows(self.ticket_id)
+            ]
 
-            btn = MDRaisedButton(
-                text=q_display_text,
-                size_hint_y=None,
-                height=dp(50),
-                md_bg_color=(0.2, 0.6, 0.2, 1) if filled else (0.5, 0.5, 0.5, 1),
-                on_release=self.make_edit_callback(i),
-            )
-            self.ids.questions_list.add_widget(btn)
+    def row_data(self, index, text, filled):
+        return {"screen": self, "question_index": index, "text": text, "filled": filled}
 
-    def make_edit_callback(self, index):
-        return lambda x: self.edit_question(index)
+    def on_store_change(self, change):
+        if change.ticket_id != self.ticket_id:
+            return
+        if change.kind == TICKET_RENAMED:
+            self.ids.ticket_title.text = f"[b]{get_repo().ticket_name(self.ticket_id)}[/b]"
+        elif change.kind == TICKET_REMOVED:
+            self.ticket_id = ""
+            self.ids.questions_list.data = []
+        elif not apply_question_change(
+            self.ids.questions_list.data,
+            change,
+            lambda index: self.row_data(*get_repo().question_row(self.ticket_id, index)),
+        ):
+            self.load_questions()
 
     def edit_question(self, index):
         screen = self.manager.get_screen("edit_question_screen")
-        screen.ticket_name = self.ticket_name
+        screen.ticket_id = self.ticket_id
         screen.question_index = index
         self.manager.current = "edit_question_screen"
 
     def add_question(self, *args):
-        data = load_data()
-        ticket = data.get(self.ticket_name, {})
-        questions = ticket.get("questions", [])
-        if len(questions) < 6:
-            self.edit_question(len(questions))
+        index = get_repo().next_question_index(self.ticket_id)
+        if index is not None:
+            self.edit_question(index)
         else:
-            print("У білеті вже 6 запитань!")
+            log.info("У білеті вже 6 запитань!")
+
+
+class ExamScreen(MDScreen):
+    """
+    Пробний екзамен: випадкові білети без повторів, самооцінка відповідей.
+    """
+
+    session = ObjectProperty(None, allownone=True)
+
+    def on_enter(self, *args):
+        if self.session is None:
+            self.start_session()
+
+    def start_session(self, seed=None):
+        self.session = get_repo().start_exam(seed)
+        self._questions = []
+        self.next_ticket()
+
+    def next_ticket(self):
+        ticket_id = self.session.draw_ticket()
+        if ticket_id is None:
+            self.show_summary()
+            return
+        self._ticket_id = ticket_id
+        self._questions = list(self.session.index.questions(ticket_id))
+        self.show_question()
+
+    def show_question(self):
+        index = self._questions[0]
+        repo = get_repo()
+        q = repo.question(self._ticket_id, index)
+        self.ids.exam_ticket_label.text = (
+            f"[b]{repo.ticket_name(self._ticket_id)}[/b] "
+            f"(залишилось білетів: {self.session.tickets_left})"
+        )
+        self.ids.exam_question_label.text = q.text
+        self.ids.exam_answer_label.text = q.answer_text or "(відповідь — зображення)"
+        self.ids.exam_answer_label.opacity = 0
+        self.session.start_question(self._ticket_id, index)
+
+    def reveal_answer(self):
+        self.ids.exam_answer_label.opacity = 1
+
+    def grade(self, correct):
+        if not self._questions:
+            return
+        self.session.grade(correct)
+        self._questions.pop(0)
+        if self._questions:
+            self.show_question()
+        else:
+            self.next_ticket()
+
+    def show_summary(self):
+        summary = self.session.summary()
+        self._questions = []
+        self.ids.exam_ticket_label.text = "[b]Екзамен завершено[/b]"
+        self.ids.exam_question_label.text = (
+            f"Білетів: {summary['tickets']}, відповідей: {summary['answered']}, "
+            f"правильно: {summary['correct']} ({summary['percent']}%)"
+        )
+        self.ids.exam_answer_label.text = (
+            f"Середній час на запитання: {summary['avg_seconds']} с"
+        )
+        self.ids.exam_answer_label.opacity = 1
+
+    def finish(self):
+        if self.session is not None and self._questions:
+            self.show_summary()
+            return
+        self.session = None
+        self.manager.current = "main_screen"
+
+
+class ReviewScreen(MDScreen):
+    """
+    Інтервальні повторення: показує запитання, яке настав час повторити.
+    """
+
+    def on_enter(self, *args):
+        self.show_next()
+
+    def show_next(self):
+        key = get_repo().next_review()
+        self._current = key
+        if key is None:
+            self.ids.review_ticket_label.text = "[b]На сьогодні все повторено[/b]"
+            self.ids.review_question_label.text = ""
+            self.ids.review_answer_label.text = ""
+            return
+        ticket_id, index = key
+        q = get_repo().question(ticket_id, index)
+        self.ids.review_ticket_label.text = f"[b]{get_repo().ticket_name(ticket_id)}[/b]"
+        self.ids.review_question_label.text = q.text
+        self.ids.review_answer_label.text = q.answer_text or "(відповідь — зображення)"
+        self.ids.review_answer_label.opacity = 0
+
+    def reveal_answer(self):
+        self.ids.review_answer_label.opacity = 1
+
+    def grade(self, quality):
+        if self._current is None:
+            return
+        get_repo().review(*self._current, quality)
+        self.show_next()
+
+
+class LazyScreenManager(ScreenManager):
+    """
+    ScreenManager, що створює екран лише при першому зверненні до нього.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._factories = {}
+
+    def add_lazy(self, name, factory):
+        self._factories[name] = factory
+
+    def get_screen(self, name):
+        factory = self._factories.pop(name, None)
+        if factory is not None:
+            self.add_widget(factory(name=name))
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        return name in self._factories or super().has_screen(name)
 
 
 class ExamTicketsApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.root_dir = os.path.dirname(os.path.abspath(__file__))  # або інший шлях, якщо треба
-        
+        # Колбеки фонових задач виконуються в головному потоці.
+        self.executor = TaskExecutor(dispatch=lambda func: on_main_thread(func)())
+        self.store = TicketStore(executor=self.executor)
+        self.image_store = ImageStore()
+        self.repo = TicketRepository(self.store, self.image_store)
+        self.sync_client = None
+
     def build(self):
         self.title = "Моя екзаменаційна шпаргалка"
         self.icon = "images/icon_app.png"
 
         Builder.load_file("examtickets.kv")
 
-        self.sm = ScreenManager()
+        # Одразу будується лише головний екран, решта — при першому переході.
+        self.sm = LazyScreenManager()
         self.sm.add_widget(MainScreen(name="main_screen"))
-        self.sm.add_widget(AddTicketScreen(name="add_ticket_screen"))
-        self.sm.add_widget(EditTicketScreen(name="edit_ticket_screen"))
-        self.sm.add_widget(TicketQuestionsScreen(name="ticket_questions_screen"))
-
-        self.sm.add_widget(EditQuestionScreen(name="edit_question_screen"))
+        self.sm.add_lazy("add_ticket_screen", AddTicketScreen)
+        self.sm.add_lazy("edit_ticket_screen", EditTicketScreen)
+        self.sm.add_lazy("ticket_questions_screen", TicketQuestionsScreen)
+        self.sm.add_lazy("edit_question_screen", EditQuestionScreen)
+        self.sm.add_lazy("exam_screen", ExamScreen)
+        self.sm.add_lazy("review_screen", ReviewScreen)
 
         self.theme_cls.primary_palette = "Blue"
         self.theme_cls.accent_palette = "Cyan"
@@ -546,7 +946,48 @@ class ExamTicketsApp(MDApp):
 
         return self.sm
 
+    def on_start(self):
+        # Читання даних винесено з критичного шляху старту: перший кадр
+        # малюється одразу, а список білетів з'являється після завантаження.
+        self.store.load_async(self.on_data_loaded)
+        if os.environ.get("EXAMTICKETS_STARTUP_PROBE"):
+            # Для benchmark.py startup: повідомляємо про перший кадр і виходимо.
+            Clock.schedule_once(self._report_first_frame)
+
+    def _report_first_frame(self, dt):
+        print(f"FIRST_FRAME {time.perf_counter():.6f}", flush=True)
+        self.stop()
+
+    def on_data_loaded(self):
+        self.sm.get_screen("main_screen").load_tickets()
+        sync_url = os.environ.get("EXAMTICKETS_SYNC_URL")
+        if sync_url:
+            # Синхронізація необов'язкова: модуль імпортується лише за наявності сервера.
+            from sync import SyncClient
+
+            self.sync_client = SyncClient(sync_url, self.store, self.image_store)
+            self.sync_client.start()
+
+    def on_pause(self):
+        # На Android застосунок може бути вбитий у фоні — скидаємо зміни одразу.
+        self.store.flush()
+        self.dump_metrics()
+        return True
+
+    def on_stop(self):
+        if self.sync_client is not None:
+            # Спершу зупиняємо синхронізацію: вона могла б змінювати вже закрите сховище.
+            self.sync_client.close()
+        self.repo.close()
+        self.dump_metrics()
+
+    def dump_metrics(self):
+        if not metrics.enabled:
+            return
+        path = metrics.dump(PERF_REPORT_DIR)
+        log.info("%s\nЗвіт збережено: %s", metrics.format_report(), path)
+
 
 if __name__ == "__main__":
-    generate_initial_data()
+    configure_logging()
     ExamTicketsApp().run()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Компактна модель даних: __slots__ замість словника на кожне запитання
+і інтерновані повторювані рядки («Запитання N», шляхи до зображень).
+Перетворення в/з JSON-схеми без втрат: невідомі ключі зберігаються в extra.
+Ідентифікатор білета — ключ у сховищі, а назва — лише його поле.
+"""
+import re
+import sys
+from dataclasses import dataclass, field
+
+QUESTION_FIELDS = ("text", "answer_text", "answer_image")
+TICKET_FIELDS = ("name", "questions")
+PLACEHOLDER = re.compile(r"^(Запитання|Питання) \d+$")
+NUMBER = re.compile(r"(\d+)")
+
+
+def _intern(value):
+    # Рядки-заготовки та шляхи повторюються тисячі разів — тримаємо по одній копії.
+    if value and (PLACEHOLDER.match(value) or value.startswith("images")):
+        return sys.intern(value)
+    return value
+
+
+@dataclass(slots=True)
+class Question:
+    text: str = ""
+    answer_text: str = ""
+    answer_image: str = ""
+    extra: dict = None
+
+    @classmethod
+    def placeholder(cls, index):
+        return cls(text=sys.intern(f"Запитання {index}"))
+
+    @classmethod
+    def from_dict(cls, d):
+        extra = {k: v for k, v in d.items() if k not in QUESTION_FIELDS} or None
+        return cls(
+            _intern(d.get("text", "")),
+            d.get("answer_text", ""),
+            _intern(d.get("answer_image", "")),
+            extra,
+        )
+
+    def to_dict(self):
+        d = {
+            "text": self.text,
+            "answer_text": self.answer_text,
+            "answer_image": self.answer_image,
+        }
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    @property
+    def is_filled(self):
+        # Той самий критерій, за яким кнопка запитання фарбується в зелений.
+        return bool(
+            self.text.strip() or self.answer_text.strip() or self.answer_image.strip()
+        )
+
+
+@dataclass(slots=True)
+class Ticket:
+    name: str = ""
+    questions: list = field(default_factory=list)
+    extra: dict = None
+
+    @classmethod
+    def from_dict(cls, d):
+        extra = {k: v for k, v in d.items() if k not in TICKET_FIELDS} or None
+        return cls(
+            d.get("name", ""), [Question.from_dict(q) for q in d.get("questions", [])], extra
+        )
+
+    def to_dict(self):
+        d = {"name": self.name, "questions": [q.to_dict() for q in self.questions]}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+def pad_questions(questions, size=6):
+    # Доповнення до 6 запитань — лише для відображення, дані не змінюються.
+    if len(questions) >= size:
+        return list(questions)
+    return list(questions) + [
+        Question.placeholder(i) for i in range(len(questions) + 1, size + 1)
+    ]
+
+
+def unique_name(name, is_taken):
+    """
+    Перша вільна назва виду «назва (2)», «назва (3)»...; is_taken(назва) -> bool.
+    """
+    i = 2
+    while is_taken(f"{name} ({i})"):
+        i += 1
+    return f"{name} ({i})"
+
+
+def natural_key(name):
+    # «Білет 2» іде перед «Білет 10»: числа порівнюються як числа.
+    # re.split з групою чергує текст і числа, тож типи на однакових позиціях збігаються.
+    parts = NUMBER.split(name.casefold())
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
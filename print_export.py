@@ -0,0 +1,233 @@
+"""
+Друк банку: усі білети з запитаннями, відповідями і зображеннями в один
+HTML-файл (кожен білет з нової сторінки) або в PDF.
+
+Кожен білет рендериться в окремий HTML-фрагмент, що кешується в
+cache/print/ за хешем вмісту білета і його зображень. Повторний експорт
+після кількох правок рендерить лише змінені білети, решта береться з кешу.
+Змінені білети обробляються в пулі процесів: зменшення зображень і
+кодування їх у base64 — робота для процесора.
+
+    python cli.py print bank.html
+    python cli.py print bank.pdf --workers 4
+
+PDF потребує необов'язкового пакета weasyprint; без нього HTML можна
+надрукувати в PDF з браузера.
+"""
+import base64
+import hashlib
+import html
+import json
+import mimetypes
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from image_cache import ThumbnailCache
+from image_store import ImageStore, normalize_image_path
+from instrumentation import get_logger, metrics
+from models import PLACEHOLDER, natural_key
+from rich_text import markdown_html
+from storage import PRINT_CACHE_DIR, atomic_write, get_backend, ticket_hash
+
+log = get_logger(__name__)
+
+# Змінюється разом із розміткою фрагмента — інакше кеш віддасть старий вигляд.
+RENDER_VERSION = 1
+MAX_IMAGE_SIZE = 1200
+# Менше змінених білетів швидше відрендерити в цьому ж процесі,
+# ніж чекати на старт пулу.
+PARALLEL_MIN_TICKETS = 16
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="uk">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+@page {{ size: A4; margin: 1.5cm; }}
+body {{ font-family: "DejaVu Sans", Arial, sans-serif; font-size: 11pt; line-height: 1.35; }}
+.ticket {{ break-before: page; page-break-before: always; }}
+.ticket:first-of-type {{ break-before: auto; page-break-before: auto; }}
+.question {{ margin-bottom: 1.2em; }}
+.question h2 {{ font-size: 13pt; margin: 0.6em 0 0.3em; }}
+.answer p {{ margin: 0.2em 0; }}
+.answer img {{ display: block; max-width: 100%; max-height: 12cm; margin-top: 0.4em;
+  break-inside: avoid; page-break-inside: avoid; }}
+.formula {{ font-family: "DejaVu Sans Mono", monospace; }}
+blockquote {{ margin: 0.3em 0 0.3em 1em; padding-left: 0.6em; border-left: 3px solid #999;
+  color: #444; }}
+pre {{ background: #f4f4f4; padding: 0.4em; white-space: pre-wrap; }}
+table {{ border-collapse: collapse; margin: 0.3em 0; }}
+th, td {{ border: 1px solid #999; padding: 2px 6px; text-align: left; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+class ExportError(Exception):
+    pass
+
+
+def _image_key(abs_path):
+    # Без читання файлу: змінений файл має інший mtime або розмір.
+    try:
+        stat = os.stat(abs_path)
+    except OSError:
+        return None
+    return [abs_path, stat.st_mtime_ns, stat.st_size]
+
+
+def fragment_key(ticket, images, max_image_size):
+    """
+    Ключ кешу фрагмента: вміст білета, стан його зображень і параметри рендерингу.
+    """
+    payload = json.dumps(
+        [RENDER_VERSION, max_image_size, ticket_hash(ticket), images], ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _image_html(abs_path, thumbnails):
+    # Зменшена копія кешується між запусками; без Pillow вбудовується оригінал.
+    path = thumbnails.get(abs_path)
+    mime = mimetypes.guess_type(path)[0] or "image/png"
+    with open(path, "rb") as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    return f'<img src="data:{mime};base64,{data}" alt="">'
+
+
+def render_ticket(job):
+    """
+    HTML-фрагмент одного білета. Виконується в процесі пулу, тому
+    отримує і повертає лише прості дані.
+    """
+    key, ticket, images, cache_dir, max_image_size = job
+    thumbnails = ThumbnailCache(os.path.join(cache_dir, "images"), max_image_size)
+    parts = [f'<section class="ticket">\n<h1>{html.escape(ticket.get("name", ""))}</h1>']
+    number = 0
+    for q in ticket.get("questions", []):
+        text = q.get("text", "").strip()
+        answer = q.get("answer_text", "").strip()
+        image = normalize_image_path(q.get("answer_image", ""))
+        if not answer and not image and (not text or PLACEHOLDER.match(text)):
+            # Незаповнена заготовка — на папері їй нічого показати.
+            continue
+        number += 1
+        parts.append(f'<div class="question">\n<h2>{number}. {html.escape(text)}</h2>')
+        parts.append('<div class="answer">')
+        if answer:
+            parts.append(markdown_html(answer))
+        abs_path = images.get(image)
+        if abs_path is not None:
+            try:
+                parts.append(_image_html(abs_path, thumbnails))
+            except OSError as e:
+                log.warning("Не вдалося додати зображення %s: %s", abs_path, e)
+        parts.append("</div>\n</div>")
+    parts.append("</section>")
+    return key, "\n".join(parts)
+
+
+def _plan(tickets, image_store, max_image_size):
+    # Для кожного білета: шляхи до наявних зображень і ключ кешу фрагмента.
+    plan = []
+    for ticket in tickets:
+        images, states = {}, []
+        for q in ticket.get("questions", []):
+            image = normalize_image_path(q.get("answer_image", ""))
+            if not image or image in images:
+                continue
+            abs_path = image_store.to_absolute(image)
+            state = _image_key(abs_path)
+            if state is None:
+                log.warning("Зображення '%s' білета '%s' не знайдено.", image, ticket.get("name"))
+                continue
+            images[image] = abs_path
+            states.append(state)
+        plan.append((fragment_key(ticket, states, max_image_size), ticket, images))
+    return plan
+
+
+def _render_changed(jobs, workers):
+    if len(jobs) < PARALLEL_MIN_TICKETS or workers == 1:
+        return map(render_ticket, jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # chunksize зменшує кількість обмінів між процесами для великих банків.
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(render_ticket, jobs, chunksize=chunksize))
+
+
+def render_bank_html(
+    data_path=None,
+    image_store=None,
+    cache_dir=PRINT_CACHE_DIR,
+    max_image_size=MAX_IMAGE_SIZE,
+    workers=None,
+    title="Екзаменаційні білети",
+):
+    """
+    Повертає (html, статистика). Статистика: білетів, відрендерено, з кешу.
+    """
+    image_store = image_store or ImageStore()
+    backend = get_backend(data_path)
+    try:
+        tickets = sorted(
+            (ticket for _, ticket in backend.iter_tickets()),
+            key=lambda t: natural_key(t.get("name", "")),
+        )
+    finally:
+        backend.close()
+
+    fragments_dir = os.path.join(cache_dir, "fragments")
+    os.makedirs(fragments_dir, exist_ok=True)
+    plan = _plan(tickets, image_store, max_image_size)
+    fragments, jobs = {}, []
+    for key, ticket, images in plan:
+        path = os.path.join(fragments_dir, key + ".html")
+        try:
+            with open(path, encoding="utf-8") as f:
+                fragments[key] = f.read()
+        except FileNotFoundError:
+            jobs.append((key, ticket, images, cache_dir, max_image_size))
+
+    with metrics.timer("print.render"):
+        for key, fragment in _render_changed(jobs, workers):
+            fragments[key] = fragment
+            atomic_write(os.path.join(fragments_dir, key + ".html"), fragment)
+
+    # Фрагменти білетів, яких більше немає або які змінилися, лише займають місце.
+    for name in os.listdir(fragments_dir):
+        if name.endswith(".html") and name[:-5] not in fragments:
+            os.remove(os.path.join(fragments_dir, name))
+
+    body = "\n".join(fragments[key] for key, _, _ in plan)
+    page = PAGE_TEMPLATE.format(title=html.escape(title), body=body)
+    stats = {"tickets": len(plan), "rendered": len(jobs), "cached": len(plan) - len(jobs)}
+    return page, stats
+
+
+def write_pdf(page, out_path):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise ExportError(
+            "Для PDF потрібен пакет weasyprint (pip install weasyprint). "
+            "Або експортуйте в .html і надрукуйте його в PDF з браузера."
+        ) from None
+    HTML(string=page).write_pdf(out_path)
+
+
+def export_print(out_path, data_path=None, image_store=None, workers=None, **options):
+    """
+    Записує банк для друку в out_path (.html або .pdf) і повертає статистику.
+    """
+    page, stats = render_bank_html(data_path, image_store, workers=workers, **options)
+    if out_path.lower().endswith(".pdf"):
+        write_pdf(page, out_path)
+    else:
+        atomic_write(os.path.abspath(out_path), page)
+    return stats
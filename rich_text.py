@@ -0,0 +1,304 @@
+"""
+Відповіді у Markdown: розбиття на блоки і перетворення блоку в розмітку Kivy
+(для екрана) або в HTML (для друку). Без Kivy, тож розбір можна заміряти
+в benchmark.py.
+
+Підтримується підмножина Markdown, якої вистачає для шпаргалок: заголовки,
+абзаци, списки, цитати, блоки коду, формули ($$ ... $$) і таблиці
+з вертикальними рисками. Одинарний перенос рядка зберігається — так
+старі відповіді, набрані звичайним текстом, виглядають як і раніше.
+"""
+import html
+import math
+import re
+from dataclasses import dataclass
+
+PARAGRAPH = "paragraph"
+HEADING = "heading"
+LIST_ITEM = "list_item"
+QUOTE = "quote"
+CODE = "code"
+FORMULA = "formula"
+TABLE = "table"
+
+MONO_FONT = "RobotoMono-Regular"
+# Довгий блок — це одна велика текстура (і ризик перевищити її максимальний
+# розмір), тому абзаци і код довші за це ріжуться по рядках.
+MAX_BLOCK_CHARS = 2000
+HEADING_SCALE = {1: 1.6, 2: 1.4, 3: 1.2}
+
+HEADING_LINE = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_LINE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+QUOTE_LINE = re.compile(r"^\s*>\s?(.*)$")
+FENCE_LINE = re.compile(r"^\s*(```|~~~)")
+TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$")
+INLINE = re.compile(
+    r"(?P<code>`[^`]+`)"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|(?<![\w*])\*(?P<italic>[^*\s](?:.*?[^*\s])?)\*(?![\w*])"
+    r"|(?<!\w)_(?P<italic2>[^_\s](?:.*?[^_\s])?)_(?!\w)"
+    r"|\$(?P<math>[^$\s](?:[^$]*[^$\s])?)\$"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    kind: str
+    text: str
+    level: int = 0
+
+
+def _is_block_start(line):
+    return bool(
+        HEADING_LINE.match(line)
+        or LIST_LINE.match(line)
+        or QUOTE_LINE.match(line)
+        or FENCE_LINE.match(line)
+        or line.lstrip().startswith(("|", "$$"))
+    )
+
+
+def _split_long(kind, lines, level=0):
+    # Ріжемо лише між рядками, щоб не розірвати слово чи розмітку.
+    chunk, size = [], 0
+    for line in lines:
+        if chunk and size + len(line) > MAX_BLOCK_CHARS:
+            yield Block(kind, "\n".join(chunk), level)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield Block(kind, "\n".join(chunk), level)
+
+
+def parse_blocks(text):
+    """
+    Розбиває Markdown на блоки, кожен з яких показується окремою міткою.
+    """
+    lines = text.replace("\r\n", "\n").split("\n")
+    blocks = []
+    i, count = 0, len(lines)
+    while i < count:
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped:
+            i += 1
+            continue
+
+        if FENCE_LINE.match(line):
+            fence = stripped[:3]
+            body = []
+            i += 1
+            while i < count and not lines[i].strip().startswith(fence):
+                body.append(lines[i])
+                i += 1
+            i += 1  # закривальний ```
+            blocks.extend(_split_long(CODE, body or [""]))
+            continue
+
+        if stripped.startswith("$$"):
+            body = [stripped[2:]]
+            # Формула в один рядок: $$ x^2 $$
+            closed = len(stripped) > 2 and stripped.endswith("$$")
+            if closed:
+                body = [stripped[2:-2]]
+            i += 1
+            while not closed and i < count:
+                current = lines[i].strip()
+                i += 1
+                if current.endswith("$$"):
+                    body.append(current[:-2])
+                    break
+                body.append(current)
+            blocks.append(Block(FORMULA, "\n".join(b for b in body if b.strip()).strip()))
+            continue
+
+        match = HEADING_LINE.match(line)
+        if match:
+            blocks.append(Block(HEADING, match.group(2).strip(), len(match.group(1))))
+            i += 1
+            continue
+
+        if stripped.startswith("|"):
+            rows = []
+            while i < count and lines[i].strip().startswith("|"):
+                rows.append(lines[i].strip())
+                i += 1
+            if all(TABLE_SEPARATOR.match(row) for row in rows):
+                # Самі розділювачі (|---|) — таблиці без клітинок немає, лишаємо текстом.
+                blocks.extend(_split_long(PARAGRAPH, rows))
+            else:
+                blocks.append(Block(TABLE, "\n".join(rows)))
+            continue
+
+        match = LIST_LINE.match(line)
+        if match:
+            indent, marker, item = match.groups()
+            item_lines = [item]
+            i += 1
+            # Продовження пункту — відступ без нового маркера.
+            while (
+                i < count
+                and lines[i].startswith((" ", "\t"))
+                and lines[i].strip()
+                and not LIST_LINE.match(lines[i])
+            ):
+                item_lines.append(lines[i].strip())
+                i += 1
+            bullet = "•" if marker in "-*+" else marker
+            level = len(indent.expandtabs(4)) // 2
+            blocks.append(Block(LIST_ITEM, f"{bullet} " + "\n".join(item_lines), level))
+            continue
+
+        match = QUOTE_LINE.match(line)
+        if match:
+            body = []
+            while i < count and (match := QUOTE_LINE.match(lines[i])):
+                body.append(match.group(1))
+                i += 1
+            blocks.extend(_split_long(QUOTE, body))
+            continue
+
+        body = [line.rstrip()]
+        i += 1
+        while i < count and lines[i].strip() and not _is_block_start(lines[i]):
+            body.append(lines[i].rstrip())
+            i += 1
+        blocks.extend(_split_long(PARAGRAPH, body))
+    return blocks
+
+
+def escape_markup(text):
+    return text.replace("&", "&amp;").replace("[", "&bl;").replace("]", "&br;")
+
+
+def _inline(match):
+    groups = match.groupdict()
+    if groups["code"]:
+        return f"[font={MONO_FONT}]{groups['code'][1:-1]}[/font]"
+    if groups["bold"] or groups["bold2"]:
+        return f"[b]{_inline_markup(groups['bold'] or groups['bold2'])}[/b]"
+    if groups["italic"] or groups["italic2"]:
+        return f"[i]{_inline_markup(groups['italic'] or groups['italic2'])}[/i]"
+    return f"[i]{groups['math']}[/i]"
+
+
+def _inline_markup(text):
+    return INLINE.sub(_inline, text)
+
+
+def _table_rows(text):
+    """
+    Клітинки таблиці, доповнені до однакової кількості стовпців,
+    і чи є в таблиці заголовок (рядок-розділювач |---|).
+    """
+    rows, has_header = [], False
+    for row in text.split("\n"):
+        if TABLE_SEPARATOR.match(row.strip()):
+            has_header = has_header or len(rows) == 1
+            continue
+        rows.append([cell.strip() for cell in row.strip().strip("|").split("|")])
+    columns = max((len(row) for row in rows), default=0)
+    return [row + [""] * (columns - len(row)) for row in rows], has_header
+
+
+def _table_markup(text):
+    rows, _ = _table_rows(text)
+    if not rows:
+        return escape_markup(text)
+    columns = len(rows[0])
+    widths = [max(len(row[c]) for row in rows) for c in range(columns)]
+    # Екрануємо вже вирівняні клітинки: &bl; та інші замінники довші за символ.
+    lines = [
+        " │ ".join(escape_markup(cell.ljust(width)) for cell, width in zip(row, widths))
+        for row in rows
+    ]
+    if len(lines) > 1:
+        lines.insert(1, "─┼─".join("─" * width for width in widths))
+        lines[0] = f"[b]{lines[0]}[/b]"
+    return f"[font={MONO_FONT}]" + "\n".join(lines) + "[/font]"
+
+
+def to_markup(block, font_size=15):
+    """
+    Розмітка Kivy (markup=True) для одного блоку.
+    """
+    if block.kind == TABLE:
+        return _table_markup(block.text)
+    text = escape_markup(block.text)
+    if block.kind == CODE:
+        return f"[font={MONO_FONT}]{text}[/font]"
+    if block.kind == FORMULA:
+        return f"[font={MONO_FONT}][i]{text}[/i][/font]"
+    markup = _inline_markup(text)
+    if block.kind == HEADING:
+        size = round(font_size * HEADING_SCALE.get(block.level, 1.1))
+        return f"[size={size}][b]{markup}[/b][/size]"
+    if block.kind == LIST_ITEM:
+        return "    " * block.level + markup
+    if block.kind == QUOTE:
+        return f"[color=555555][i]{markup}[/i][/color]"
+    return markup
+
+
+def _inline_html(match):
+    groups = match.groupdict()
+    if groups["code"]:
+        return f"<code>{groups['code'][1:-1]}</code>"
+    if groups["bold"] or groups["bold2"]:
+        return f"<strong>{inline_html(groups['bold'] or groups['bold2'])}</strong>"
+    if groups["italic"] or groups["italic2"]:
+        return f"<em>{inline_html(groups['italic'] or groups['italic2'])}</em>"
+    return f'<em class="math">{groups["math"]}</em>'
+
+
+def inline_html(text):
+    # Викликається для вже екранованого тексту.
+    return INLINE.sub(_inline_html, text)
+
+
+def to_html(block):
+    """
+    HTML для одного блоку. Заголовки відповіді починаються з <h3>:
+    <h1> і <h2> на сторінці друку зайняті білетом і запитанням.
+    """
+    if block.kind == TABLE:
+        rows, has_header = _table_rows(block.text)
+        lines = []
+        for i, row in enumerate(rows):
+            tag = "th" if has_header and i == 0 else "td"
+            cells = "".join(f"<{tag}>{inline_html(html.escape(cell))}</{tag}>" for cell in row)
+            lines.append(f"<tr>{cells}</tr>")
+        return "<table>" + "".join(lines) + "</table>"
+    text = html.escape(block.text, quote=False)
+    if block.kind == CODE:
+        return f"<pre><code>{text}</code></pre>"
+    if block.kind == FORMULA:
+        return f'<p class="formula"><em>{text}</em></p>'
+    markup = inline_html(text).replace("\n", "<br>")
+    if block.kind == HEADING:
+        level = min(block.level + 2, 6)
+        return f"<h{level}>{markup}</h{level}>"
+    if block.kind == LIST_ITEM:
+        return f'<p class="item" style="margin-left: {block.level * 1.5 + 1}em">{markup}</p>'
+    if block.kind == QUOTE:
+        return f"<blockquote>{markup}</blockquote>"
+    return f"<p>{markup}</p>"
+
+
+def markdown_html(text):
+    return "\n".join(to_html(block) for block in parse_blocks(text))
+
+
+def estimate_height(block, width, font_size, line_height=1.25):
+    """
+    Висота блоку без рендерингу: за кількістю символів у рядку.
+    Справжню висоту рядок уточнить, коли вперше стане видимим.
+    """
+    if block.kind == HEADING:
+        font_size *= HEADING_SCALE.get(block.level, 1.1)
+    # Середня ширина символу — приблизно половина кегля.
+    per_line = max(1, int(width / (font_size * 0.55)))
+    lines = sum(max(1, math.ceil(len(line) / per_line)) for line in block.text.split("\n"))
+    return math.ceil(lines * font_size * line_height)
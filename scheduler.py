@@ -0,0 +1,155 @@
+"""
+Інтервальні повторення за алгоритмом SM-2.
+Стан карток — ключ (id білета, індекс запитання) — зберігається окремо
+від даних білетів: кожна оцінка дописується рядком у журнал, а знімок стану
+переписується лише під час ущільнення.
+"""
+import heapq
+import json
+import os
+import time
+
+from storage import REVIEW_LOG_PATH, REVIEW_STATE_PATH, atomic_write, read_json
+
+DAY = 24 * 60 * 60
+# Скільки рядків журналу накопичити, перш ніж переписати знімок.
+COMPACT_EVERY = 500
+
+
+class Card:
+    __slots__ = ("easiness", "interval", "repetitions", "due", "version")
+
+    def __init__(self, easiness=2.5, interval=0, repetitions=0, due=0.0):
+        self.easiness = easiness
+        self.interval = interval
+        self.repetitions = repetitions
+        self.due = due
+        self.version = 0
+
+    def review(self, quality, now):
+        # SM-2: quality від 0 (зовсім не знаю) до 5 (ідеально).
+        if quality < 3:
+            self.repetitions = 0
+            self.interval = 1
+        else:
+            self.repetitions += 1
+            if self.repetitions == 1:
+                self.interval = 1
+            elif self.repetitions == 2:
+                self.interval = 6
+            else:
+                self.interval = round(self.interval * self.easiness)
+        self.easiness = max(
+            1.3, self.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        )
+        self.due = now + self.interval * DAY
+        self.version += 1
+
+    def to_list(self):
+        return [self.easiness, self.interval, self.repetitions, self.due]
+
+
+class Scheduler:
+    """
+    Черга карток за часом наступного повторення на купі (heapq).
+    Застарілі записи купи не видаляються, а пропускаються (версія картки),
+    тож і оцінка, і пошук наступної картки — O(log n).
+    """
+
+    def __init__(self, state_path=REVIEW_STATE_PATH, log_path=REVIEW_LOG_PATH):
+        self.state_path = state_path
+        self.log_path = log_path
+        self.cards = {}
+        self._heap = []
+        self._log_lines = 0
+        self._compacted_lines = 0
+
+    # --- Завантаження і збереження ---
+
+    def load(self):
+        state = read_json(self.state_path, {}) if os.path.exists(self.state_path) else {}
+        for entry in state.get("cards", []):
+            ticket, question, easiness, interval, repetitions, due = entry
+            self.cards[(ticket, question)] = Card(easiness, interval, repetitions, due)
+        self._compacted_lines = self._log_lines = state.get("log_lines", 0)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f):
+                    if line_no < self._compacted_lines:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Обірваний останній рядок після збою — пропускаємо.
+                        continue
+                    key = (entry["ticket"], entry["question"])
+                    self.cards.setdefault(key, Card()).review(entry["quality"], entry["ts"])
+                    self._log_lines = line_no + 1
+        self._heap = [(card.due, key, card.version) for key, card in self.cards.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def compact(self):
+        cards = [[*key, *card.to_list()] for key, card in self.cards.items()]
+        atomic_write(
+            self.state_path,
+            json.dumps({"log_lines": self._log_lines, "cards": cards}, ensure_ascii=False),
+        )
+        self._compacted_lines = self._log_lines
+
+    def rekey(self, mapping):
+        """
+        Переносить картки на нові ключі {старий: новий} і одразу ущільнює
+        журнал, щоб старі ключі не відновилися з нього при наступному load().
+        """
+        for old, new in mapping.items():
+            self.cards[new] = self.cards.pop(old)
+        self._heap = [(card.due, key, card.version) for key, card in self.cards.items()]
+        heapq.heapify(self._heap)
+        self.compact()
+
+    # --- Черга ---
+
+    def add_cards(self, keys, now=None):
+        """
+        Додає нові (ще не оцінені) картки — вони стають до повторення одразу.
+        """
+        now = time.time() if now is None else now
+        for key in keys:
+            if key not in self.cards:
+                card = Card(due=now)
+                self.cards[key] = card
+                heapq.heappush(self._heap, (card.due, key, card.version))
+
+    def next_due(self, now=None):
+        """
+        Найближча картка до повторення (ключ) або None, якщо нічого не настав час.
+        """
+        now = time.time() if now is None else now
+        heap = self._heap
+        while heap:
+            due, key, version = heap[0]
+            card = self.cards.get(key)
+            if card is None or card.version != version:
+                heapq.heappop(heap)
+                continue
+            return key if due <= now else None
+        return None
+
+    def review(self, key, quality, now=None):
+        now = time.time() if now is None else now
+        card = self.cards.setdefault(key, Card())
+        card.review(quality, now)
+        heapq.heappush(self._heap, (card.due, key, card.version))
+        entry = {"ticket": key[0], "question": key[1], "quality": quality, "ts": now}
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log_lines += 1
+        if self._log_lines - self._compacted_lines >= COMPACT_EVERY:
+            self.compact()
+        return card
+
+    def due_count(self, now=None):
+        now = time.time() if now is None else now
+        return sum(1 for card in self.cards.values() if card.due <= now)
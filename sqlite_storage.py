@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+
+from instrumentation import get_logger
+from storage import JsonFileBackend, legacy_ticket_id
+
+log = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    uid TEXT,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    ticket_id INTEGER NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    answer_text TEXT NOT NULL DEFAULT '',
+    answer_image TEXT NOT NULL DEFAULT '',
+    UNIQUE (ticket_id, idx)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    text, answer_text, content='questions', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts(rowid, text, answer_text)
+    VALUES (new.rowid, new.text, new.answer_text);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, text, answer_text)
+    VALUES ('delete', old.rowid, old.text, old.answer_text);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_au AFTER UPDATE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, text, answer_text)
+    VALUES ('delete', old.rowid, old.text, old.answer_text);
+    INSERT INTO questions_fts(rowid, text, answer_text)
+    VALUES (new.rowid, new.text, new.answer_text);
+END;
+"""
+
+
+def fts_query(text):
+    # Кожне слово — окрема фраза з пошуком за префіксом,
+    # тож спецсимволи FTS5 у запиті користувача нічого не зламають.
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w)
+
+
+class SqliteBackend:
+    """
+    Сховище у SQLite (режим WAL) з повнотекстовим індексом FTS5
+    за текстом запитань і відповідей.
+    """
+
+    incremental = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        # Чи була схема в базі до першого підключення (див. exists()).
+        self._existed = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            # Збереження виконується з фонового потоку, тому доступ
+            # до з'єднання серіалізуємо власним блокуванням.
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._existed = (
+                self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tickets'"
+                ).fetchone()
+                is not None
+            )
+            self._conn.executescript(SCHEMA)
+            self._migrate(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn):
+        # Бази, створені до появи постійних ідентифікаторів, отримують колонку uid.
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(tickets)")]
+        with conn:
+            if "uid" not in columns:
+                conn.execute("ALTER TABLE tickets ADD COLUMN uid TEXT")
+            # uid виводиться з назви, як і в інших форматах: копії однієї старої
+            # бази на різних машинах отримують однакові id.
+            conn.executemany(
+                "UPDATE tickets SET uid = ? WHERE id = ?",
+                [
+                    (legacy_ticket_id(name), ticket_id)
+                    for ticket_id, name in conn.execute(
+                        "SELECT id, name FROM tickets WHERE uid IS NULL"
+                    ).fetchall()
+                ],
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS tickets_uid ON tickets(uid)")
+
+    def exists(self):
+        # Банк існує, якщо була схема, навіть без жодного білета: інакше база,
+        # з якої видалили всі білети, знову отримала б початкові 25.
+        if self._conn is None and not os.path.exists(self.path):
+            return False
+        with self._lock:
+            self.conn
+        return self._existed
+
+    def load(self):
+        data = {}
+        with self._lock:
+            ids = {}
+            for ticket_id, uid, name in self.conn.execute(
+                "SELECT id, uid, name FROM tickets ORDER BY position"
+            ):
+                ids[ticket_id] = uid
+                data[uid] = {"name": name, "questions": []}
+            for ticket_id, text, answer_text, answer_image in self.conn.execute(
+                "SELECT ticket_id, text, answer_text, answer_image "
+                "FROM questions ORDER BY ticket_id, idx"
+            ):
+                data[ids[ticket_id]]["questions"].append(
+                    {"text": text, "answer_text": answer_text, "answer_image": answer_image}
+                )
+        return data
+
+    def ticket_index(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT uid, name FROM tickets ORDER BY position"
+            ).fetchall()
+        return dict(rows)
+
+    def iter_tickets(self, batch_size=500):
+        # Читаємо порціями, щоб не тримати весь банк у пам'яті.
+        last_position = None
+        while True:
+            with self._lock:
+                tickets = self.conn.execute(
+                    "SELECT id, uid, name, position FROM tickets "
+                    "WHERE ? IS NULL OR position > ? ORDER BY position LIMIT ?",
+                    (last_position, last_position, batch_size),
+                ).fetchall()
+                if not tickets:
+                    return
+                questions = {}
+                for ticket_id, text, answer_text, answer_image in self.conn.execute(
+                    "SELECT ticket_id, text, answer_text, answer_image FROM questions "
+                    f"WHERE ticket_id IN ({','.join('?' * len(tickets))}) "
+                    "ORDER BY ticket_id, idx",
+                    [row[0] for row in tickets],
+                ):
+                    questions.setdefault(ticket_id, []).append(
+                        {"text": text, "answer_text": answer_text, "answer_image": answer_image}
+                    )
+            for ticket_id, uid, name, position in tickets:
+                yield uid, {"name": name, "questions": questions.get(ticket_id, [])}
+            last_position = tickets[-1][3]
+
+    def save(self, data):
+        with self._lock:
+            existing = [row[0] for row in self.conn.execute("SELECT uid FROM tickets")]
+        removed = set(existing) - set(data)
+        self.save_tickets(data, removed, list(data))
+
+    def save_tickets(self, tickets, removed=(), order=None):
+        # Порядок білетів задається позицією при вставці, тож order тут не потрібен.
+        with self._lock, self.conn as conn:
+            for uid in removed:
+                conn.execute("DELETE FROM tickets WHERE uid = ?", (uid,))
+            rows = {}
+            for uid, ticket in tickets.items():
+                row = rows[uid] = conn.execute(
+                    "SELECT id, name FROM tickets WHERE uid = ?", (uid,)
+                ).fetchone()
+                if row is not None and row[1] != ticket.get("name", ""):
+                    # Спершу звільняємо старі назви: інакше обмін назвами (А↔Б)
+                    # в одному записі порушить UNIQUE на першому ж UPDATE.
+                    conn.execute("UPDATE tickets SET name = ? WHERE id = ?", ("\0" + uid, row[0]))
+            for uid, ticket in tickets.items():
+                name = ticket.get("name", "")
+                row = rows[uid]
+                if row is None:
+                    cursor = conn.execute(
+                        "INSERT INTO tickets (uid, name, position) "
+                        "VALUES (?, ?, (SELECT COALESCE(MAX(position), 0) + 1 FROM tickets))",
+                        (uid, name),
+                    )
+                    ticket_id = cursor.lastrowid
+                else:
+                    ticket_id = row[0]
+                    # Перейменування — лише нова назва в тому самому рядку.
+                    conn.execute("UPDATE tickets SET name = ? WHERE id = ?", (name, ticket_id))
+                    conn.execute("DELETE FROM questions WHERE ticket_id = ?", (ticket_id,))
+                conn.executemany(
+                    "INSERT INTO questions (ticket_id, idx, text, answer_text, answer_image) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            ticket_id,
+                            idx,
+                            q.get("text", ""),
+                            q.get("answer_text", ""),
+                            q.get("answer_image", ""),
+                        )
+                        for idx, q in enumerate(ticket.get("questions", []))
+                    ],
+                )
+
+    def search(self, query, limit=50):
+        match = fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT t.uid, q.idx, q.text FROM questions_fts "
+                "JOIN questions q ON q.rowid = questions_fts.rowid "
+                "JOIN tickets t ON t.id = q.ticket_id "
+                "WHERE questions_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [(uid, idx, text) for uid, idx, text in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def import_json(json_path, db_path):
+    data = JsonFileBackend(json_path).load()
+    backend = SqliteBackend(db_path)
+    backend.save(data)
+    backend.close()
+    log.info("Імпортовано %d білетів у %s", len(data), db_path)
+    return len(data)
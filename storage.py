@@ -0,0 +1,337 @@
+import hashlib
+import json, os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from instrumentation import configure_logging, get_logger, metrics
+from models import pad_questions
+
+log = get_logger(__name__)
+
+# Визначаємо шлях до кореня програми ОДИН РАЗ, при старті
+# Це гарантує, що ми завжди знаємо, де знаходиться корінь, незалежно від CWD.
+APP_ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(APP_ROOT_DIR, "data", "exam_tickets_data.json")
+SHARDED_DATA_DIR = os.path.join(APP_ROOT_DIR, "data", "tickets")
+SQLITE_DATA_PATH = os.path.join(APP_ROOT_DIR, "data", "exam_tickets.db")
+REVIEW_STATE_PATH = os.path.join(APP_ROOT_DIR, "data", "review_state.json")
+REVIEW_LOG_PATH = os.path.join(APP_ROOT_DIR, "data", "review_log.jsonl")
+SYNC_STATE_PATH = os.path.join(APP_ROOT_DIR, "data", "sync_state.db")
+SYNC_CONFLICTS_PATH = os.path.join(APP_ROOT_DIR, "data", "sync_conflicts.jsonl")
+IMAGES_DIR = os.path.join(APP_ROOT_DIR, "images")
+THUMBNAILS_DIR = os.path.join(APP_ROOT_DIR, "cache", "thumbnails")
+PERF_REPORT_DIR = os.path.join(APP_ROOT_DIR, "cache", "perf")
+PRINT_CACHE_DIR = os.path.join(APP_ROOT_DIR, "cache", "print")
+# Простір імен для id, що виводяться з назви білета старого формату.
+LEGACY_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "examtickets.legacy")
+
+
+def serialize_data(data):
+    return json.dumps(data, ensure_ascii=False, indent=4)
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def ticket_hash(ticket):
+    return content_hash(json.dumps(ticket, ensure_ascii=False, sort_keys=True))
+
+
+def atomic_write(path, text):
+    # Пишемо у тимчасовий файл поруч і атомарно підміняємо ним оригінал:
+    # збій посеред запису не зіпсує вже збережені дані.
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        metrics.count("files.written")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        # Наступне збереження перепише пошкоджений файл, тому лишаємо його копію:
+        # з неї білети ще можна врятувати.
+        backup = f"{path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        shutil.copy2(path, backup)
+        log.error(
+            "Помилка читання JSON з %s (%s). Повертаємо порожні дані; копію збережено в %s. "
+            "Відновлення: python cli.py check --repair --salvage %s",
+            path,
+            e,
+            backup,
+            backup,
+        )
+        return default
+
+
+def new_ticket_id():
+    return uuid.uuid4().hex
+
+
+def legacy_ticket_id(name):
+    # Копії одного старого банку на різних машинах мусять отримати однакові id,
+    # інакше синхронізація подвоїть кожен білет.
+    return uuid.uuid5(LEGACY_ID_NAMESPACE, name).hex
+
+
+def _has_name(ticket):
+    return isinstance(ticket, dict) and "name" in ticket
+
+
+def is_legacy_data(data):
+    # До появи постійних ідентифікаторів ключем білета була його назва.
+    return not all(_has_name(t) for t in data.values())
+
+
+def assign_ticket_ids(data):
+    """
+    Переводить дані старого формату {назва: білет} у {id: білет з полем name}.
+    Записи, що вже мають назву, лишаються під своїм id. Порядок зберігається.
+    """
+    result = {}
+    for key, ticket in data.items():
+        if _has_name(ticket):
+            result[key] = ticket
+        else:
+            result[legacy_ticket_id(key)] = {"name": key, **(ticket if isinstance(ticket, dict) else {})}
+    return result
+
+
+class JsonFileBackend:
+    """
+    Класичний формат: усі білети в одному JSON-файлі.
+    Будь-яке збереження переписує файл повністю.
+    """
+
+    incremental = False
+
+    def __init__(self, path, migrate=False):
+        self.path = path
+        # Старий формат переписується на диску лише з migrate=True (застосунок,
+        # migrate-ids, імпорт); команди лише для читання файл не змінюють.
+        self.migrate = migrate
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        if not self.exists():
+            return {}
+        data = read_json(self.path, {})
+        if is_legacy_data(data):
+            data = assign_ticket_ids(data)
+            if self.migrate:
+                # Ідентифікатори мусять бути постійними, тож файл одразу переписуємо.
+                self.save(data)
+                log.info("Білетам у %s призначено постійні ідентифікатори.", self.path)
+        return data
+
+    def save(self, data):
+        atomic_write(self.path, serialize_data(data))
+
+    def ticket_index(self):
+        """
+        {id: назва} у порядку збереження.
+        """
+        return {tid: ticket.get("name", "") for tid, ticket in self.load().items()}
+
+    def iter_tickets(self):
+        # Один файл доводиться читати повністю.
+        yield from self.load().items()
+
+    def close(self):
+        # Відкритих ресурсів немає; метод є, щоб усі формати закривалися однаково.
+        pass
+
+
+class ShardedBackend:
+    """
+    Один файл на білет і маленький маніфест з порядком білетів:
+    {id: {"name": назва, "file": файл}}.
+    Збереження торкається лише змінених білетів.
+    """
+
+    incremental = True
+    MANIFEST = "manifest.json"
+    FORMAT = "sharded"
+    VERSION = 2
+
+    def __init__(self, root, migrate=False):
+        self.root = root
+        # Як у JsonFileBackend: маніфест версії 1 переписується лише з migrate=True.
+        self.migrate = migrate
+        self.manifest_path = os.path.join(root, self.MANIFEST)
+        self._files = None
+        self._next_id = 1
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    def _shard_path(self, file_name):
+        return os.path.join(self.root, file_name)
+
+    def _load_manifest(self):
+        if self._files is None:
+            manifest = read_json(self.manifest_path, {}) if self.exists() else {}
+            self._files = dict(manifest.get("tickets", {}))
+            self._next_id = manifest.get("next_id", len(self._files) + 1)
+            if self._files and manifest.get("version", 1) < self.VERSION:
+                # Версія 1: {назва: файл}. Файли білетів лишаються на місці,
+                # переписується лише маніфест.
+                self._files = {
+                    legacy_ticket_id(name): {"name": name, "file": file_name}
+                    for name, file_name in self._files.items()
+                }
+                if self.migrate:
+                    self._write_manifest(list(self._files))
+        return self._files
+
+    def _write_manifest(self, order):
+        files = self._files
+        manifest = {
+            "format": self.FORMAT,
+            "version": self.VERSION,
+            "next_id": self._next_id,
+            "tickets": {tid: files[tid] for tid in order if tid in files},
+        }
+        atomic_write(self.manifest_path, serialize_data(manifest))
+
+    def load(self):
+        return dict(self.iter_tickets())
+
+    def ticket_index(self):
+        return {tid: entry["name"] for tid, entry in self._load_manifest().items()}
+
+    def iter_tickets(self):
+        # Білети читаються по одному — весь банк у пам'яті не потрібен.
+        for tid, entry in list(self._load_manifest().items()):
+            path = self._shard_path(entry["file"])
+            if os.path.exists(path):
+                ticket = read_json(path, {})
+                # Файли версії 1 назви не містять — вона є лише в маніфесті.
+                ticket.setdefault("name", entry["name"])
+                yield tid, ticket
+            else:
+                log.warning("Файл білета '%s' не знайдено: %s", entry["name"], path)
+
+    def save(self, data):
+        files = self._load_manifest()
+        removed = set(files) - set(data)
+        self.save_tickets(data, removed, list(data))
+
+    def save_tickets(self, tickets, removed=(), order=None):
+        files = self._load_manifest()
+        manifest_changed = False
+        for tid, ticket in tickets.items():
+            entry = files.get(tid)
+            if entry is None:
+                entry = files[tid] = {"name": "", "file": f"{self._next_id:06d}.json"}
+                self._next_id += 1
+                manifest_changed = True
+            if entry["name"] != ticket.get("name", ""):
+                # Перейменування: файл білета той самий, змінюється лише запис у маніфесті.
+                entry["name"] = ticket.get("name", "")
+                manifest_changed = True
+            atomic_write(self._shard_path(entry["file"]), serialize_data(ticket))
+        for tid in removed:
+            entry = files.pop(tid, None)
+            if entry is None:
+                continue
+            manifest_changed = True
+            path = self._shard_path(entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+        if order is not None and list(files) != [tid for tid in order if tid in files]:
+            manifest_changed = True
+        if manifest_changed:
+            self._write_manifest(order if order is not None else list(files))
+
+    def close(self):
+        pass
+
+
+def get_backend(path=None, migrate=False):
+    # Шлях до .json — один файл, .db/.sqlite — SQLite, інакше — тека з маніфестом.
+    # migrate=True дозволяє одразу переписати на диску старий формат без id.
+    if path is None:
+        path = default_data_path()
+    if path.endswith(".json"):
+        return JsonFileBackend(path, migrate)
+    if path.endswith((".db", ".sqlite")):
+        # Стовпець uid додається при підключенні: без нього база непридатна.
+        from sqlite_storage import SqliteBackend
+
+        return SqliteBackend(path)
+    return ShardedBackend(path, migrate)
+
+
+def default_data_path():
+    if os.path.exists(SQLITE_DATA_PATH):
+        return SQLITE_DATA_PATH
+    if ShardedBackend(SHARDED_DATA_DIR).exists():
+        return SHARDED_DATA_DIR
+    return DATA_PATH
+
+
+def load_data(path=None):
+    return get_backend(path).load()
+
+
+def save_data(data, path=None):
+    get_backend(path).save(data)
+
+
+def migrate_to_sharded(json_path=DATA_PATH, root=SHARDED_DATA_DIR):
+    """
+    Переносить дані з одного JSON-файлу у формат «файл на білет».
+    Оригінальний файл не видаляється.
+    """
+    data = JsonFileBackend(json_path).load()
+    ShardedBackend(root).save(data)
+    log.info("Перенесено %d білетів у %s", len(data), root)
+    return len(data)
+
+
+def make_initial_data():
+    return {
+        new_ticket_id(): {
+            "name": f"Білет {i}",
+            "questions": [q.to_dict() for q in pad_questions([])],
+        }
+        for i in range(1, 26)
+    }
+
+
+if __name__ == "__main__":
+    configure_logging()
+    if sys.argv[1:2] == ["migrate"]:
+        migrate_to_sharded(*sys.argv[2:4])
+    elif sys.argv[1:2] == ["migrate-ids"]:
+        # Кожен формат сам призначає id під час першого читання.
+        backend = get_backend(*sys.argv[2:3], migrate=True)
+        print(f"Білетів з постійними id: {len(backend.ticket_index())}")
+        backend.close()
+    elif sys.argv[1:2] == ["import-sqlite"]:
+        from sqlite_storage import import_json
+
+        import_json(*(sys.argv[2:4] or (DATA_PATH, SQLITE_DATA_PATH)))
+    else:
+        print("Використання: python storage.py migrate [json_path] [shard_dir]")
+        print("              python storage.py migrate-ids [data_path]")
+        print("              python storage.py import-sqlite [json_path] [db_path]")
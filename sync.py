@@ -0,0 +1,672 @@
+"""
+Синхронізація банку між кількома комп'ютерами через невеликий HTTP-сервер.
+
+Передаються лише змінені білети (і лише ті зображення, яких бракує іншій
+стороні), тіла запитів стиснені gzip. Кожен білет має вектор версій
+{репліка: лічильник}: за ним сервер відрізняє послідовні правки від
+одночасних, а одночасні зливає по полях — назва і кожне запитання окремо.
+Якщо те саме запитання змінили обидві сторони, лишається версія сервера,
+а локальна записується у data/sync_conflicts.jsonl.
+
+    python sync.py serve --port 8765
+    python sync.py sync http://127.0.0.1:8765
+
+Сервер не має автентифікації — він для локальної мережі.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from image_store import ImageStore, image_references
+from instrumentation import configure_logging, get_logger, metrics
+from models import Ticket, unique_name
+from storage import (
+    APP_ROOT_DIR,
+    SYNC_CONFLICTS_PATH,
+    SYNC_STATE_PATH,
+    content_hash,
+    new_ticket_id,
+    ticket_hash,
+)
+
+SERVER_REPLICA = "server"
+IMAGE_NAME = re.compile(r"^[\w-][\w.-]*$")
+DEFAULT_PORT = 8765
+
+log = get_logger(__name__)
+
+
+class SyncError(Exception):
+    pass
+
+
+# --- Версії та злиття ---
+
+
+def dominates(a, b):
+    """
+    True, якщо вектор версій a містить усе, що бачив b.
+    """
+    return all(a.get(replica, 0) >= counter for replica, counter in b.items())
+
+
+def merge_versions(a, b):
+    return {replica: max(a.get(replica, 0), b.get(replica, 0)) for replica in {*a, *b}}
+
+
+def question_hash(q):
+    if q is None:
+        return ""
+    return content_hash(json.dumps(q, ensure_ascii=False, sort_keys=True))[:16]
+
+
+def ticket_base(ticket):
+    # Спільний предок для злиття: назва і короткі хеші запитань.
+    return {
+        "name": ticket.get("name", ""),
+        "questions": [question_hash(q) for q in ticket.get("questions", [])],
+    }
+
+
+def merge_ticket(ours, theirs, base):
+    """
+    Тристороннє злиття: ours — версія сервера, theirs — клієнта,
+    base — предок з ticket_base() (None, якщо спільного предка немає).
+    Повертає (злитий білет, список конфліктів).
+    """
+    base = base or {"name": None, "questions": []}
+    merged = dict(ours, questions=[])
+    conflicts = []
+    if theirs["name"] != ours["name"]:
+        if ours["name"] == base["name"]:
+            merged["name"] = theirs["name"]
+        elif theirs["name"] != base["name"]:
+            conflicts.append({"field": "name", "local": theirs["name"], "remote": ours["name"]})
+    ours_q, theirs_q, base_q = ours["questions"], theirs["questions"], base["questions"]
+    for i in range(max(len(ours_q), len(theirs_q))):
+        o = ours_q[i] if i < len(ours_q) else None
+        t = theirs_q[i] if i < len(theirs_q) else None
+        b = base_q[i] if i < len(base_q) else ""
+        o_hash, t_hash = question_hash(o), question_hash(t)
+        if o_hash == t_hash or t_hash == b:
+            value = o
+        elif o_hash == b:
+            value = t
+        else:
+            value = o
+            conflicts.append({"field": "question", "question": i, "local": t, "remote": o})
+        if value is not None:
+            merged["questions"].append(value)
+    return merged, conflicts
+
+
+# --- Транспорт ---
+
+
+def pack(payload):
+    return gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def unpack(body):
+    return json.loads(gzip.decompress(body).decode("utf-8")) if body else {}
+
+
+# --- Сервер ---
+
+SERVER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    versions TEXT NOT NULL,
+    ticket TEXT
+);
+CREATE INDEX IF NOT EXISTS tickets_seq ON tickets(seq);
+"""
+
+
+class SyncServer:
+    """
+    Стан сервера: білети з векторами версій і номером зміни (seq) у SQLite.
+    Клієнт забирає лише рядки з seq, більшим за побачений ним,
+    тож вартість синхронізації залежить від кількості змін, а не від розміру банку.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.images_dir = os.path.join(root, "images")
+        os.makedirs(self.images_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "sync.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SERVER_SCHEMA)
+
+    def sync(self, request):
+        changes = request.get("changes", [])
+        since = request.get("since", 0)
+        conflicts = []
+        # id -> seq прийнятих без змін версій клієнта: назад їх не надсилаємо.
+        echoed = {}
+        forced = set()
+        with self._lock, self.conn as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM tickets").fetchone()[0]
+            for change in changes:
+                ticket_id, versions, ticket = change["id"], change["versions"], change["ticket"]
+                row = conn.execute(
+                    "SELECT versions, ticket FROM tickets WHERE id = ?", (ticket_id,)
+                ).fetchone()
+                server_versions = json.loads(row[0]) if row else {}
+                server_ticket = json.loads(row[1]) if row and row[1] else None
+                if dominates(versions, server_versions):
+                    echo = True
+                elif dominates(server_versions, versions):
+                    # Клієнт надіслав застарілу версію — повертаємо йому актуальну.
+                    forced.add(ticket_id)
+                    continue
+                else:
+                    echo = False
+                    if ticket is None and server_ticket is not None:
+                        # Видалення проти правки: правка перемагає.
+                        ticket = server_ticket
+                        conflicts.append({"ticket": ticket_id, "field": "deleted"})
+                    elif ticket is not None and server_ticket is not None:
+                        ticket, found = merge_ticket(server_ticket, ticket, change.get("base"))
+                        conflicts.extend(dict(c, ticket=ticket_id) for c in found)
+                    versions = merge_versions(versions, server_versions)
+                    versions[SERVER_REPLICA] = versions.get(SERVER_REPLICA, 0) + 1
+                seq += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO tickets (id, seq, versions, ticket) VALUES (?, ?, ?, ?)",
+                    (
+                        ticket_id,
+                        seq,
+                        json.dumps(versions),
+                        json.dumps(ticket, ensure_ascii=False) if ticket is not None else None,
+                    ),
+                )
+                if echo:
+                    echoed[ticket_id] = seq
+            rows = conn.execute(
+                "SELECT id, seq, versions, ticket FROM tickets WHERE seq > ? ORDER BY seq",
+                (since,),
+            ).fetchall()
+            if forced:
+                rows += conn.execute(
+                    f"SELECT id, seq, versions, ticket FROM tickets "
+                    f"WHERE seq <= ? AND id IN ({','.join('?' * len(forced))})",
+                    (since, *forced),
+                ).fetchall()
+        return {
+            "seq": seq,
+            "changes": [
+                {
+                    "id": ticket_id,
+                    "versions": json.loads(versions),
+                    "ticket": json.loads(ticket) if ticket else None,
+                }
+                for ticket_id, row_seq, versions, ticket in rows
+                if echoed.get(ticket_id) != row_seq
+            ],
+            "conflicts": conflicts,
+        }
+
+    def image_path(self, name):
+        if not IMAGE_NAME.match(name):
+            raise SyncError(f"Недопустима назва зображення: {name}")
+        return os.path.join(self.images_dir, name)
+
+    def missing_images(self, names):
+        return [name for name in names if not os.path.exists(self.image_path(name))]
+
+    def put_image(self, name, body):
+        path = self.image_path(name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.images_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self.conn.close()
+
+
+class SyncRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ExamTicketsSync/1"
+
+    @property
+    def state(self):
+        return self.server.sync_server
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, body, content_type="application/json", status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if content_type == "application/json":
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        try:
+            request = unpack(self._body())
+            if self.path == "/sync":
+                self._send(pack(self.state.sync(request)))
+            elif self.path == "/images/missing":
+                self._send(pack({"images": self.state.missing_images(request["images"])}))
+            else:
+                self.send_error(404)
+        except (SyncError, ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+
+    def do_PUT(self):
+        if not self.path.startswith("/images/"):
+            self.send_error(404)
+            return
+        try:
+            self.state.put_image(self.path[len("/images/"):], self._body())
+        except SyncError as e:
+            self.send_error(400, str(e))
+            return
+        self._send(pack({}))
+
+    def do_GET(self):
+        if not self.path.startswith("/images/"):
+            self.send_error(404)
+            return
+        try:
+            path = self.state.image_path(self.path[len("/images/"):])
+        except SyncError as e:
+            self.send_error(400, str(e))
+            return
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            self._send(f.read(), "application/octet-stream")
+
+    def log_message(self, format, *args):
+        # Без рядка в консолі на кожен запит.
+        pass
+
+
+def make_server(root, host="127.0.0.1", port=DEFAULT_PORT):
+    httpd = ThreadingHTTPServer((host, port), SyncRequestHandler)
+    httpd.sync_server = SyncServer(root)
+    return httpd
+
+
+# --- Клієнт ---
+
+CLIENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    versions TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    base TEXT NOT NULL
+);
+"""
+
+
+class SyncClient:
+    """
+    Синхронізує TicketStore з сервером. Що змінилося локально, клієнт знає
+    з подій сховища; лише перша синхронізація в процесі звіряє хеші всіх
+    білетів — щоб врахувати правки, зроблені без увімкненої синхронізації.
+    """
+
+    def __init__(
+        self,
+        url,
+        store,
+        image_store=None,
+        state_path=SYNC_STATE_PATH,
+        conflicts_path=SYNC_CONFLICTS_PATH,
+        timeout=30,
+    ):
+        self.url = url.rstrip("/")
+        self.store = store
+        self.image_store = image_store or ImageStore()
+        self.conflicts_path = conflicts_path
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        self.conn = sqlite3.connect(state_path, check_same_thread=False)
+        self.conn.executescript(CLIENT_SCHEMA)
+        self.replica = self._meta("replica") or new_ticket_id()
+        self._set_meta("replica", self.replica)
+        self._changed = set()
+        self._changed_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # Зупиняє фоновий потік start() під час close().
+        self._stopped = threading.Event()
+        self._scanned = False
+        # Потік, що саме застосовує зміни з сервера: його події — не локальні правки.
+        self._applying = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        store.subscribe(self._on_change)
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+            )
+
+    def _on_change(self, change):
+        if self._applying == threading.get_ident():
+            return
+        with self._changed_lock:
+            self._changed.add(change.ticket_id)
+
+    # --- HTTP ---
+
+    def _request(self, method, path, payload=None, body=None):
+        if payload is not None:
+            body = pack(payload)
+        request = urllib.request.Request(self.url + path, data=body, method=method)
+        if payload is not None:
+            request.add_header("Content-Type", "application/json")
+            request.add_header("Content-Encoding", "gzip")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+                compressed = response.headers.get("Content-Encoding") == "gzip"
+        except (urllib.error.URLError, OSError) as e:
+            raise SyncError(f"Сервер синхронізації недоступний: {e}") from e
+        self.bytes_sent += len(body or b"")
+        self.bytes_received += len(data)
+        return unpack(data) if compressed else data
+
+    # --- Синхронізація ---
+
+    def _candidates(self):
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        if not self._scanned:
+            # Перша синхронізація: всі білети сховища і всі, що були синхронізовані.
+            self._scanned = True
+            changed.update(self.store.ticket_ids())
+            changed.update(row[0] for row in self.conn.execute("SELECT id FROM tickets"))
+        return changed
+
+    def _local_changes(self, candidates):
+        changes = []
+        clock = int(self._meta("clock", 0))
+        for ticket_id in candidates:
+            row = self.conn.execute(
+                "SELECT versions, hash, base FROM tickets WHERE id = ?", (ticket_id,)
+            ).fetchone()
+            if self.store.has_ticket(ticket_id):
+                ticket = self.store.get_ticket(ticket_id).to_dict()
+                current = ticket_hash(ticket)
+            elif row is not None:
+                ticket, current = None, ""
+            else:
+                continue
+            if row is not None and row[1] == current:
+                continue
+            clock += 1
+            versions = json.loads(row[0]) if row else {}
+            versions[self.replica] = clock
+            changes.append(
+                {
+                    "id": ticket_id,
+                    "versions": versions,
+                    "ticket": ticket,
+                    "base": json.loads(row[2]) if row else None,
+                    "hash": current,
+                }
+            )
+        self._set_meta("clock", clock)
+        return changes
+
+    def _image_names(self, tickets):
+        names = {}
+        for path in image_references(dict(enumerate(tickets))):
+            abs_path = self.image_store.to_absolute(path)
+            if self.image_store.is_stored(abs_path):
+                names[os.path.basename(abs_path)] = abs_path
+        return names
+
+    def _push_images(self, changes):
+        local = self._image_names(c["ticket"] for c in changes if c["ticket"])
+        local = {name: path for name, path in local.items() if os.path.exists(path)}
+        if not local:
+            return 0
+        missing = self._request("POST", "/images/missing", {"images": sorted(local)})["images"]
+        for name in missing:
+            with open(local[name], "rb") as f:
+                self._request("PUT", f"/images/{name}", body=f.read())
+        return len(missing)
+
+    def _pull_images(self, tickets):
+        needed = {
+            name: path
+            for name, path in self._image_names(tickets).items()
+            if not os.path.exists(path) and IMAGE_NAME.match(name)
+        }
+        if not needed:
+            return 0
+        # Файлів, яких немає й на сервері (посилання бите ще в джерелі), не просимо.
+        absent = set(
+            self._request("POST", "/images/missing", {"images": sorted(needed)})["images"]
+        )
+        count = 0
+        for name, path in needed.items():
+            if name in absent:
+                continue
+            data = self._request("GET", f"/images/{name}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            count += 1
+        return count
+
+    def _free_name(self, name):
+        return unique_name(name, lambda candidate: self.store.find_ticket(candidate) is not None)
+
+    def _claim_name(self, name, ticket_id):
+        """
+        Дві машини могли створити білети з однаковою назвою. Назву лишає білет
+        з меншим id, інший отримує суфікс — на всіх машинах однаково.
+        """
+        owner = self.store.find_ticket(name)
+        if owner is None or owner == ticket_id:
+            return name
+        if ticket_id < owner:
+            # Перейменування локального білета піде на сервер наступного разу.
+            self.store.rename_ticket(owner, self._free_name(name))
+            with self._changed_lock:
+                self._changed.add(owner)
+            return name
+        return self._free_name(name)
+
+    def _apply(self, ticket_id, ticket):
+        store = self.store
+        if ticket is None:
+            store.remove_ticket(ticket_id)
+            return
+        model = Ticket.from_dict(ticket)
+        name = self._claim_name(model.name, ticket_id)
+        if store.has_ticket(ticket_id):
+            if name != store.ticket_name(ticket_id):
+                store.rename_ticket(ticket_id, name)
+            store.set_questions(ticket_id, model.questions)
+        else:
+            store.add_ticket(name, model.questions, ticket_id=ticket_id)
+
+    def _remember(self, conn, ticket_id, versions, ticket, current):
+        if ticket is None:
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO tickets (id, versions, hash, base) VALUES (?, ?, ?, ?)",
+            (ticket_id, json.dumps(versions), current, json.dumps(ticket_base(ticket))),
+        )
+
+    def _record_conflicts(self, conflicts):
+        os.makedirs(os.path.dirname(self.conflicts_path), exist_ok=True)
+        with open(self.conflicts_path, "a", encoding="utf-8") as f:
+            for conflict in conflicts:
+                name = self.store.ticket_name(conflict["ticket"])
+                entry = dict(conflict, name=name, time=time.time())
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        log.warning("Конфліктів синхронізації: %d, див. %s", len(conflicts), self.conflicts_path)
+
+    def sync(self):
+        """
+        Один обмін із сервером. Повертає статистику:
+        надіслано і отримано білетів, конфліктів, зображень, байтів.
+        """
+        with self._sync_lock, metrics.timer("sync.run"):
+            sent_before, received_before = self.bytes_sent, self.bytes_received
+            candidates = self._candidates()
+            try:
+                changes = self._local_changes(candidates)
+                uploaded = self._push_images(changes)
+                response = self._request(
+                    "POST",
+                    "/sync",
+                    {
+                        "replica": self.replica,
+                        "since": int(self._meta("seq", 0)),
+                        "changes": [
+                            {key: c[key] for key in ("id", "versions", "ticket", "base")}
+                            for c in changes
+                        ],
+                    },
+                )
+                remote = response["changes"]
+                downloaded = self._pull_images(c["ticket"] for c in remote if c["ticket"])
+                self._applying = threading.get_ident()
+                try:
+                    self._apply_response(changes, remote, response["seq"])
+                finally:
+                    self._applying = None
+            except Exception:
+                # Будь-яка помилка до запису стану: невідправлені зміни
+                # повертаються в наступну спробу.
+                with self._changed_lock:
+                    self._changed.update(candidates)
+                raise
+            if response["conflicts"]:
+                self._record_conflicts(response["conflicts"])
+            return {
+                "sent": len(changes),
+                "received": len(remote),
+                "conflicts": len(response["conflicts"]),
+                "images": uploaded + downloaded,
+                "bytes_sent": self.bytes_sent - sent_before,
+                "bytes_received": self.bytes_received - received_before,
+            }
+
+    def _apply_response(self, changes, remote, seq):
+        with self.conn as conn:
+            for change in changes:
+                self._remember(
+                    conn, change["id"], change["versions"], change["ticket"], change["hash"]
+                )
+            for change in remote:
+                ticket_id, ticket = change["id"], change["ticket"]
+                self._apply(ticket_id, ticket)
+                current = ticket_hash(ticket) if ticket is not None else ""
+                self._remember(conn, ticket_id, change["versions"], ticket, current)
+                if ticket is not None and ticket_hash(
+                    self.store.get_ticket(ticket_id).to_dict()
+                ) != current:
+                    # Назву довелося змінити — локальна версія піде на сервер.
+                    with self._changed_lock:
+                        self._changed.add(ticket_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('seq', ?)", (str(seq),)
+            )
+
+    def start(self, interval=60):
+        """
+        Синхронізація у фоновому потоці кожні interval секунд.
+        """
+
+        def loop():
+            while not self._stopped.is_set():
+                try:
+                    self.sync()
+                except SyncError as e:
+                    log.warning("%s", e)
+                except Exception:
+                    # Потік синхронізації не мусить зупинитися через одну невдачу.
+                    log.exception("Синхронізація завершилася помилкою")
+                self._stopped.wait(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def close(self):
+        self._stopped.set()
+        self.store.unsubscribe(self._on_change)
+        # Чекаємо на обмін, що саме триває у фоновому потоці.
+        with self._sync_lock:
+            self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Синхронізація банку білетів")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="запустити сервер синхронізації")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--root", default=os.path.join(APP_ROOT_DIR, "data", "sync_server"))
+
+    p_sync = sub.add_parser("sync", help="синхронізувати локальний банк")
+    p_sync.add_argument("url")
+    p_sync.add_argument("--data", help="шлях до даних (.json, .db або тека з маніфестом)")
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    if args.command == "serve":
+        httpd = make_server(args.root, args.host, args.port)
+        print(f"Сервер синхронізації: http://{args.host}:{args.port} ({args.root})")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        httpd.sync_server.close()
+        return 0
+
+    from ticket_store import TicketStore
+
+    store = TicketStore(args.data)
+    client = SyncClient(args.url, store)
+    try:
+        stats = client.sync()
+    except SyncError as e:
+        print(f"⚠️ {e}")
+        return 1
+    finally:
+        client.close()
+        store.close()
+    print(
+        f"Надіслано білетів: {stats['sent']}, отримано: {stats['received']}, "
+        f"конфліктів: {stats['conflicts']}, зображень: {stats['images']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Модулі застосунку лежать у корені репозиторію, без пакета.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import save_data  # noqa: E402
+
+
+def make_bank(count=3):
+    return {
+        f"{i:032x}": {
+            "name": f"Білет {i}",
+            "questions": [
+                {"text": f"Запитання {j}", "answer_text": "", "answer_image": ""}
+                for j in range(1, 7)
+            ],
+        }
+        for i in range(1, count + 1)
+    }
+
+
+@pytest.fixture
+def bank_path(tmp_path):
+    path = str(tmp_path / "bank.json")
+    save_data(make_bank(), path)
+    return path
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import cli
+from cli import ConflictError, ImportFormatError, import_bank, import_tickets
+from storage import ShardedBackend, get_backend, save_data
+
+
+@pytest.mark.parametrize("name", ["bank.db", "shards"])
+def test_failed_import_writes_nothing(tmp_path, monkeypatch, name):
+    path = str(tmp_path / name)
+    save_data({"1": {"name": "Білет 1", "questions": []}}, path)
+    monkeypatch.setattr(cli, "BATCH_SIZE", 1)
+    tickets = [("Новий 1", []), ("Новий 2", []), ("Білет 1", [])]
+
+    backend = get_backend(path)
+    with pytest.raises(ConflictError):
+        import_tickets(lambda: iter(tickets), backend, on_conflict="fail")
+    backend.close()
+
+    backend = get_backend(path)
+    assert list(backend.ticket_index().values()) == ["Білет 1"]
+    backend.close()
+
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for ticket, index in rows:
+            record = {"ticket": ticket, "index": index, "text": f"{ticket}{index}"}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def test_fail_import_streams_in_batches(tmp_path, monkeypatch):
+    path = str(tmp_path / "shards")
+    save_data({"1": {"name": "Білет 1", "questions": []}}, path)
+    source = str(tmp_path / "in.jsonl")
+    write_jsonl(source, [("A", 0), ("B", 0), ("C", 0)])
+    monkeypatch.setattr(cli, "BATCH_SIZE", 1)
+    saved = []
+    original = ShardedBackend.save_tickets
+
+    def counting(self, tickets, *args, **kwargs):
+        saved.append(len(tickets))
+        return original(self, tickets, *args, **kwargs)
+
+    monkeypatch.setattr(ShardedBackend, "save_tickets", counting)
+    assert import_bank(source, data_path=path, on_conflict="fail")["imported"] == 3
+    # Без конфліктів білети пишуться пачками під час читання, а не всі в кінці.
+    assert saved == [1, 1, 1]
+
+    write_jsonl(source, [("D", 0), ("Білет 1", 0)])
+    with pytest.raises(ConflictError):
+        import_bank(source, data_path=path, on_conflict="fail")
+    assert sorted(get_backend(path).ticket_index().values()) == ["A", "B", "C", "Білет 1"]
+
+
+@pytest.mark.parametrize("policy", cli.CONFLICT_POLICIES)
+def test_ungrouped_input_is_rejected(tmp_path, policy):
+    path = str(tmp_path / "shards")
+    save_data({}, path)
+    source = str(tmp_path / "in.jsonl")
+    write_jsonl(source, [("A", 0), ("B", 0), ("A", 1)])
+    with pytest.raises(ImportFormatError):
+        import_bank(source, data_path=path, on_conflict=policy)
+    assert get_backend(path).ticket_index() == {}
+
+
+def test_rename_avoids_names_from_the_same_file(tmp_path):
+    path = str(tmp_path / "shards")
+    save_data({"1": {"name": "A", "questions": []}}, path)
+    source = str(tmp_path / "in.jsonl")
+    write_jsonl(source, [("A", 0), ("A (2)", 0)])
+    stats = import_bank(source, data_path=path, on_conflict="rename")
+    assert stats["imported"] == 2
+    assert sorted(get_backend(path).ticket_index().values()) == ["A", "A (2)", "A (3)"]
@@ -0,0 +1,84 @@
+import pytest
+
+from conftest import make_bank
+from core import QUESTIONS_PER_TICKET, TicketError, TicketRepository
+from image_store import ImageStore
+from storage import save_data
+from ticket_store import TicketStore
+
+# Синтетичний банк: 200 білетів по 6 запитань — 1200 запитань.
+BANK_SIZE = 200
+
+
+@pytest.fixture(params=["bank.json", "bank.db", "shards"])
+def bank(tmp_path, request):
+    path = str(tmp_path / request.param)
+    save_data(make_bank(BANK_SIZE), path)
+    return path
+
+
+def open_repo(path, tmp_path):
+    store = TicketStore(path, flush_delay=60)
+    return TicketRepository(store, ImageStore(str(tmp_path / "images"), str(tmp_path)))
+
+
+def test_load_in_natural_order(bank, tmp_path):
+    repo = open_repo(bank, tmp_path)
+    names = [name for _, name in repo.tickets()]
+    assert names == [f"Білет {i}" for i in range(1, BANK_SIZE + 1)]
+    assert repo.store.write_count == 0
+    repo.close()
+
+
+def test_save_question_persists_with_one_write(bank, tmp_path):
+    repo = open_repo(bank, tmp_path)
+    ticket_id = f"{7:032x}"
+    repo.save_question(ticket_id, 2, " Що таке індекс? ", " B-дерево ")
+    repo.close()
+    assert repo.store.write_count == 1
+
+    repo = open_repo(bank, tmp_path)
+    question = repo.question(ticket_id, 2)
+    assert (question.text, question.answer_text) == ("Що таке індекс?", "B-дерево")
+    repo.close()
+
+
+def test_rename_keeps_id_and_order(bank, tmp_path):
+    repo = open_repo(bank, tmp_path)
+    ticket_id = f"{2:032x}"
+    assert repo.rename_ticket(ticket_id, "Білет 1000")
+    assert not repo.rename_ticket(ticket_id, "Білет 1000")
+    with pytest.raises(TicketError):
+        repo.rename_ticket(ticket_id, "Білет 3")
+    repo.close()
+
+    repo = open_repo(bank, tmp_path)
+    assert repo.tickets()[-1] == (ticket_id, "Білет 1000")
+    repo.close()
+
+
+def test_add_ticket_pads_questions(bank, tmp_path):
+    repo = open_repo(bank, tmp_path)
+    with pytest.raises(TicketError):
+        repo.add_ticket("  ")
+    with pytest.raises(TicketError):
+        repo.add_ticket("Білет 1")
+    ticket_id = repo.add_ticket("Білет 0", ["Перше"])
+    repo.close()
+
+    repo = open_repo(bank, tmp_path)
+    assert repo.tickets()[0] == (ticket_id, "Білет 0")
+    rows = repo.question_rows(ticket_id)
+    assert len(rows) == QUESTIONS_PER_TICKET
+    assert rows[0][1] == "Перше"
+    repo.close()
+
+
+def test_search_finds_saved_answer(bank, tmp_path):
+    repo = open_repo(bank, tmp_path)
+    ticket_id = f"{150:032x}"
+    repo.save_question(ticket_id, 4, "Нормальні форми", "третя нормальна форма")
+    results = repo.search("нормальна форма")
+    assert results == [(ticket_id, "Білет 150", 4, "Нормальні форми")]
+    assert repo.search("   ") == []
+    repo.close()
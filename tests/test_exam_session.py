@@ -0,0 +1,28 @@
+from conftest import make_bank
+from exam_session import ExamSession, FilledIndex
+from models import Question
+from storage import save_data
+from ticket_store import TicketStore
+
+
+def draw_all(store, seed):
+    session = ExamSession(FilledIndex.from_store(store), seed=seed)
+    return [session.draw_ticket() for _ in range(session.tickets_left)]
+
+
+def test_same_seed_draws_same_order_after_edits(tmp_path):
+    path = str(tmp_path / "bank.json")
+    bank = make_bank(5)
+    for ticket in bank.values():
+        ticket["questions"] = [{"text": "", "answer_text": "відповідь", "answer_image": ""}]
+    save_data(bank, path)
+    store = TicketStore(path, flush_delay=60)
+    before = draw_all(store, seed=42)
+
+    # Білет перестає бути заповненим і знову стає таким.
+    ticket_id = store.ticket_ids()[0]
+    store.set_question(ticket_id, 0, Question())
+    store.set_question(ticket_id, 0, Question("", "відповідь"))
+
+    assert draw_all(store, seed=42) == before
+    store.close()
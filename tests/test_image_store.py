@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from image_store import GarbageCollectionError, ImageStore
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    store = ImageStore(str(tmp_path / "images"), str(tmp_path))
+    os.makedirs(store.images_dir)
+    return store
+
+
+def add_old_image(image_store, name):
+    path = os.path.join(image_store.images_dir, name)
+    with open(path, "wb") as f:
+        f.write(b"png")
+    os.utime(path, (0, 0))
+    return path
+
+
+def test_gc_refuses_unreadable_bank(image_store):
+    path = add_old_image(image_store, "a" * 64 + ".png")
+    with pytest.raises(GarbageCollectionError):
+        image_store.collect_garbage({})
+    assert os.path.exists(path)
+
+
+def test_gc_removes_only_unreferenced(image_store):
+    kept = add_old_image(image_store, "a" * 64 + ".png")
+    orphan = add_old_image(image_store, "b" * 64 + ".png")
+    question = {"text": "", "answer_text": "", "answer_image": image_store.to_relative(kept)}
+    data = {"1": {"name": "Білет 1", "questions": [question]}}
+    assert image_store.collect_garbage(data) == [orphan]
+    assert os.path.exists(kept) and not os.path.exists(orphan)
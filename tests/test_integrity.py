@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from image_store import ImageStore
+from integrity import check_bank, run_check
+from sqlite_storage import SqliteBackend
+from storage import JsonFileBackend, ShardedBackend, load_data, save_data
+
+BACKENDS = {"bank.json": JsonFileBackend, "bank.db": SqliteBackend, "shards": ShardedBackend}
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    return ImageStore(str(tmp_path / "images"), str(tmp_path))
+
+
+def test_ticket_without_questions_is_valid(image_store):
+    report = check_bank({"1": {"name": "Білет №3"}}, image_store)
+    assert report.ok
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_repair_backs_up_every_format(tmp_path, image_store, name):
+    path = str(tmp_path / name)
+    question = {"text": "Запитання", "answer_text": "", "answer_image": "images/missing.png"}
+    save_data({"1": {"name": "Білет 1", "questions": [question]}}, path)
+
+    report = run_check(path, repair=True, image_store=image_store)
+
+    assert report.repaired and report.dangling
+    backups = [entry for entry in os.listdir(tmp_path) if entry.startswith(name + ".bak-")]
+    assert len(backups) == 1
+    # Копія — банк до ремонту, з посиланням на відсутній файл.
+    backup = BACKENDS[name](str(tmp_path / backups[0]))
+    assert backup.load()["1"]["questions"][0] == question
+    backup.close()
+    assert load_data(path)["1"]["questions"][0]["answer_image"] == ""
@@ -0,0 +1,86 @@
+from conftest import make_bank
+from core import TicketRepository, apply_question_change, patch_ticket_rows
+from storage import save_data
+from ticket_store import QUESTION_UPDATED, TicketStore
+
+
+def open_repo(tmp_path, count):
+    path = str(tmp_path / "bank.json")
+    save_data(make_bank(count), path)
+    return TicketRepository(TicketStore(path, flush_delay=60))
+
+
+def ticket_row(repo):
+    return lambda ticket_id: {"ticket_id": ticket_id, "name": repo.ticket_name(ticket_id)}
+
+
+def test_queued_changes_after_rebuild_are_dropped(tmp_path):
+    repo = open_repo(tmp_path, 20)
+    queued = []
+    # Події з фонового потоку чекають у черзі головного потоку.
+    repo.subscribe(queued.append)
+    repo.delete_ticket(f"{3:032x}")
+    repo.add_ticket("Білет 0")
+    repo.rename_ticket(f"{5:032x}", "Білет 50")
+
+    # Тим часом список перебудували — він уже містить усі три зміни.
+    version, tickets = repo.versioned_tickets()
+    rows = [ticket_row(repo)(ticket_id) for ticket_id, _ in tickets]
+    for change in queued:
+        version = patch_ticket_rows(rows, version, change, ticket_row(repo))
+    assert [row["ticket_id"] for row in rows] == repo.store.ticket_ids()
+    repo.close()
+
+
+def test_out_of_order_change_requests_rebuild(tmp_path):
+    repo = open_repo(tmp_path, 5)
+    version, tickets = repo.versioned_tickets()
+    rows = [ticket_row(repo)(ticket_id) for ticket_id, _ in tickets]
+    queued = []
+    repo.subscribe(queued.append)
+    repo.add_ticket("Білет 0")
+    repo.delete_ticket(f"{2:032x}")
+    assert patch_ticket_rows(rows, version, queued[1], ticket_row(repo)) is None
+    repo.close()
+
+
+def test_one_edit_builds_one_row(tmp_path):
+    # RecycleView оновлює віджети лише для змінених елементів data,
+    # тож кількість побудованих рядків — це кількість оновлених віджетів.
+    repo = open_repo(tmp_path, 5000)
+    built = []
+    target = f"{2500:032x}"
+
+    def make_ticket_row(ticket_id):
+        built.append(ticket_id)
+        return ticket_row(repo)(ticket_id)
+
+    def make_question_row(index):
+        built.append(index)
+        return repo.question_row(target, index)
+
+    version, tickets = repo.versioned_tickets()
+    ticket_rows = [make_ticket_row(ticket_id) for ticket_id, _ in tickets]
+    question_rows = [make_question_row(index) for index in range(6)]
+    state = {"version": version}
+
+    def on_change(change):
+        state["version"] = patch_ticket_rows(
+            ticket_rows, state["version"], change, make_ticket_row
+        )
+        if change.ticket_id == target and change.kind == QUESTION_UPDATED:
+            assert apply_question_change(question_rows, change, make_question_row)
+
+    repo.subscribe(on_change)
+    actions = [
+        (lambda: repo.save_question(target, 0, "Запитання", "нова відповідь"), 1),
+        (lambda: repo.rename_ticket(target, "Білет 1a"), 1),
+        (lambda: repo.add_ticket("Білет 4999a", ["Запитання 1"]), 1),
+        (lambda: repo.delete_ticket(f"{3:032x}"), 0),
+    ]
+    for action, expected in actions:
+        built.clear()
+        action()
+        assert len(built) == expected
+    assert [row["ticket_id"] for row in ticket_rows] == repo.store.ticket_ids()
+    repo.close()
@@ -0,0 +1,12 @@
+from models import natural_key, unique_name
+
+
+def test_unique_name_skips_taken_suffixes():
+    taken = {"Білет 1", "Білет 1 (2)", "Білет 1 (3)"}
+    assert unique_name("Білет 1", taken.__contains__) == "Білет 1 (4)"
+    assert unique_name("Білет 2", taken.__contains__) == "Білет 2 (2)"
+
+
+def test_natural_key_orders_numbers():
+    names = ["Білет 10", "Білет 2", "білет 1"]
+    assert sorted(names, key=natural_key) == ["білет 1", "Білет 2", "Білет 10"]
@@ -0,0 +1,25 @@
+import pytest
+
+from rich_text import PARAGRAPH, TABLE, Block, markdown_html, parse_blocks, to_html, to_markup
+
+
+@pytest.mark.parametrize("text", ["|---|", "| --- | :-: |\n|---|"])
+def test_separator_only_table_is_text(text):
+    blocks = parse_blocks(text)
+    assert [block.kind for block in blocks] == [PARAGRAPH]
+    assert to_markup(blocks[0])
+    assert markdown_html(text).startswith("<p>")
+
+
+def test_table_block_without_cells_does_not_crash():
+    block = Block(TABLE, "|---|")
+    assert to_markup(block) == "|---|"
+    assert to_html(block) == "<table></table>"
+
+
+def test_table_with_header():
+    blocks = parse_blocks("| a | b |\n|---|---|\n| 1 |")
+    assert [block.kind for block in blocks] == [TABLE]
+    assert to_html(blocks[0]) == (
+        "<table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td></td></tr></table>"
+    )
@@ -0,0 +1,39 @@
+from sqlite_storage import SqliteBackend
+from ticket_store import TicketStore
+
+
+def test_emptied_database_is_not_reseeded(tmp_path):
+    path = str(tmp_path / "bank.db")
+    store = TicketStore(path, flush_delay=60)
+    # Нова база отримує початкові білети.
+    ticket_ids = store.ticket_ids()
+    assert ticket_ids
+    for ticket_id in ticket_ids:
+        store.remove_ticket(ticket_id)
+    store.close()
+
+    store = TicketStore(path, flush_delay=60)
+    assert store.ticket_ids() == []
+    store.close()
+
+
+def test_missing_database_does_not_exist(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "none.db"))
+    assert not backend.exists()
+
+
+def test_swapping_names_in_one_flush(tmp_path):
+    path = str(tmp_path / "bank.db")
+    store = TicketStore(path, flush_delay=60)
+    first, second = store.ticket_ids()[:2]
+    store.flush()
+    first_name, second_name = store.ticket_name(first), store.ticket_name(second)
+    store.rename_ticket(first, "тимчасова")
+    store.rename_ticket(second, first_name)
+    store.rename_ticket(first, second_name)
+    store.close()
+
+    store = TicketStore(path, flush_delay=60)
+    assert store.ticket_name(first) == second_name
+    assert store.ticket_name(second) == first_name
+    store.close()
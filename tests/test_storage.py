@@ -0,0 +1,50 @@
+import json
+
+from cli import export_bank
+from storage import ShardedBackend, assign_ticket_ids, is_legacy_data
+from ticket_store import TicketStore
+
+
+def write_legacy_bank(path):
+    data = {"Білет 1": {"questions": []}, "Білет 2": {"questions": []}}
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path.read_text(encoding="utf-8")
+
+
+def test_only_entries_without_name_get_new_ids():
+    data = {"a" * 32: {"name": "Білет 1", "questions": []}, "Білет 2": {"questions": []}}
+    assert is_legacy_data(data)
+    migrated = assign_ticket_ids(data)
+    assert migrated["a" * 32] == data["a" * 32]
+    assert sorted(t["name"] for t in migrated.values()) == ["Білет 1", "Білет 2"]
+    assert not is_legacy_data(migrated)
+
+
+def test_export_does_not_rewrite_legacy_file(tmp_path):
+    bank = tmp_path / "bank.json"
+    original = write_legacy_bank(bank)
+    export_bank(str(tmp_path / "out.jsonl"), data_path=str(bank))
+    assert bank.read_text(encoding="utf-8") == original
+
+
+def test_store_migrates_legacy_file(tmp_path):
+    bank = tmp_path / "bank.json"
+    write_legacy_bank(bank)
+    store = TicketStore(str(bank), flush_delay=60)
+    store.load()
+    store.close()
+    data = json.loads(bank.read_text(encoding="utf-8"))
+    assert sorted(t["name"] for t in data.values()) == ["Білет 1", "Білет 2"]
+
+
+def test_legacy_ids_are_deterministic(tmp_path):
+    data = {"Білет 1": {"questions": []}}
+    assert assign_ticket_ids(data).keys() == assign_ticket_ids(data).keys()
+    # Маніфест версії 1 ({назва: файл}) отримує ті самі id, що й JSON.
+    root = tmp_path / "shards"
+    root.mkdir()
+    (root / "manifest.json").write_text(
+        json.dumps({"tickets": {"Білет 1": "000001.json"}}), encoding="utf-8"
+    )
+    (root / "000001.json").write_text(json.dumps({"questions": []}), encoding="utf-8")
+    assert ShardedBackend(str(root)).ticket_index().keys() == assign_ticket_ids(data).keys()
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+import pytest
+
+from image_store import ImageStore
+from sync import SyncClient, make_server
+from ticket_store import TicketStore
+
+
+@pytest.fixture
+def server(tmp_path):
+    httpd = make_server(str(tmp_path / "server"), port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.sync_server.close()
+
+
+def make_client(url, root, data):
+    os.makedirs(root)
+    path = os.path.join(root, "bank.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    store = TicketStore(path, flush_delay=60)
+    client = SyncClient(
+        url,
+        store,
+        ImageStore(os.path.join(root, "images"), root),
+        os.path.join(root, "sync.db"),
+        os.path.join(root, "conflicts.jsonl"),
+    )
+    return store, client
+
+
+def test_copies_of_legacy_bank_do_not_duplicate(server, tmp_path):
+    # Старий формат: ключ білета — його назва.
+    legacy = {
+        f"Білет №{i}": {"questions": [{"text": f"Запитання {i}", "answer_text": ""}]}
+        for i in range(1, 4)
+    }
+    clients = [make_client(server, str(tmp_path / name), legacy) for name in ("a", "b")]
+    try:
+        for _ in range(2):
+            for _, client in clients:
+                client.sync()
+        for store, _ in clients:
+            names = sorted(store.ticket_name(tid) for tid in store.ticket_ids())
+            assert names == ["Білет №1", "Білет №2", "Білет №3"]
+    finally:
+        for store, client in clients:
+            client.close()
+            store.close()
+
+
+def test_failed_sync_keeps_local_changes(server, tmp_path, monkeypatch):
+    data = {f"{i:032x}": {"name": f"Білет {i}", "questions": []} for i in range(1, 3)}
+    store, client = make_client(server, str(tmp_path / "a"), data)
+    try:
+        client.sync()
+        store.rename_ticket(f"{1:032x}", "Перейменований")
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("збій")
+
+        monkeypatch.setattr(client, "_pull_images", broken)
+        with pytest.raises(RuntimeError):
+            client.sync()
+        monkeypatch.undo()
+        assert client.sync()["sent"] == 1
+    finally:
+        client.close()
+        store.close()
+
+
+def test_sync_thread_survives_unexpected_errors(server, tmp_path, monkeypatch):
+    store, client = make_client(server, str(tmp_path / "a"), {})
+    calls = []
+    done = threading.Event()
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("збій")
+        done.set()
+
+    monkeypatch.setattr(client, "sync", flaky)
+    try:
+        client.start(interval=0.01)
+        assert done.wait(5)
+    finally:
+        client.close()
+        store.close()
@@ -0,0 +1,61 @@
+import pytest
+
+from core import QUESTIONS_PER_TICKET, TicketRepository
+from models import Question
+from storage import save_data
+from ticket_store import TicketStore
+
+
+def test_failed_flush_keeps_changes_dirty(bank_path, monkeypatch):
+    store = TicketStore(bank_path, flush_delay=60)
+    ticket_id = store.ticket_ids()[0]
+    store.set_question(ticket_id, 0, Question("нове"))
+
+    def broken_save(data):
+        raise OSError("диск заповнений")
+
+    monkeypatch.setattr(store.backend, "save", broken_save)
+    # Таймер, on_pause і пошук не падають: зміни лишаються в черзі.
+    store.flush()
+    assert store.is_dirty and store.write_count == 0
+    with pytest.raises(OSError):
+        store.close()
+    assert store.is_dirty
+
+    monkeypatch.undo()
+    store.close()
+    assert TicketStore(bank_path).get_questions(ticket_id)[0].text == "нове"
+
+
+def test_browsing_does_not_write(tmp_path):
+    # Білет з неповним списком запитань: екран доповнює його заготовками,
+    # але це не зміна даних і на диск нічого не пишеться.
+    path = str(tmp_path / "bank.json")
+    save_data(
+        {"a" * 32: {"name": "Білет 1", "questions": [{"text": "одне", "answer_text": ""}]}},
+        path,
+    )
+    store = TicketStore(path, flush_delay=60)
+    repo = TicketRepository(store)
+    for ticket_id, _ in repo.tickets():
+        rows = repo.question_rows(ticket_id)
+        repo.question(ticket_id, len(rows) - 1)
+    store.flush()
+    assert store.write_count == 0
+    assert len(rows) == QUESTIONS_PER_TICKET
+
+    repo.save_question("a" * 32, 0, "змінене", "відповідь")
+    store.flush()
+    assert store.write_count == 1
+    store.close()
+
+
+def test_reverted_edit_of_new_ticket_is_still_written(bank_path):
+    store = TicketStore(bank_path, flush_delay=60)
+    ticket_id = store.add_ticket("Новий", [Question("q")])
+    store.set_question(ticket_id, 0, Question("x"))
+    store.set_question(ticket_id, 0, Question("q"))
+    store.flush()
+    assert store.write_count == 1
+    store.close()
+    assert TicketStore(bank_path).get_questions(ticket_id)[0].text == "q"
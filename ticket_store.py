@@ -0,0 +1,401 @@
+import bisect
+import threading
+from dataclasses import dataclass
+
+from instrumentation import get_logger, metrics
+from models import Question, Ticket, natural_key
+from storage import get_backend, make_initial_data, new_ticket_id, ticket_hash
+from workers import TaskExecutor
+
+log = get_logger(__name__)
+
+TICKET_ADDED = "ticket_added"
+TICKET_RENAMED = "ticket_renamed"
+TICKET_REMOVED = "ticket_removed"
+QUESTION_UPDATED = "question_updated"
+
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    """
+    Подія зміни даних. Позиції — у впорядкованому списку білетів
+    (ticket_ids()); question_index=None означає, що змінилися всі запитання.
+    version — номер зміни в сховищі (див. TicketStore.versioned_tickets()).
+    """
+
+    kind: str
+    ticket_id: str
+    position: int = None
+    old_position: int = None
+    question_index: int = None
+    version: int = 0
+
+
+class TicketStore:
+    """
+    Єдине сховище білетів у пам'яті.
+    Дані читаються один раз, усі читання обслуговуються з пам'яті,
+    а зміни накопичуються і записуються у фоновому потоці з затримкою (debounce).
+    У пам'яті білети зберігаються як models.Ticket; у словники JSON-схеми
+    вони перетворюються лише на межі з backend.
+    Білети адресуються постійними ідентифікаторами, тож перейменування
+    змінює лише поле name одного білета.
+    """
+
+    def __init__(self, path=None, flush_delay=1.0, executor=None):
+        self.backend = get_backend(path, migrate=True)
+        self.flush_delay = flush_delay
+        # Пул фонових задач для файлових операцій; спільний з TicketRepository.
+        self.executor = executor if executor is not None else TaskExecutor()
+        self._data = None
+        # {назва: id} і відсортований природним порядком список (ключ назви, id).
+        self._ids = {}
+        self._order = []
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        # Хеші білетів у тому вигляді, в якому вони лежать на диску.
+        self._saved_hashes = {}
+        # Лічильник реальних записів на диск (для діагностики та бенчмарків).
+        self.write_count = 0
+        # Номер останньої зміни даних; росте на одиницю з кожною подією.
+        self.version = 0
+        # {id білета: [індекси заповнених запитань]}, будується при першому запиті.
+        self._filled = None
+        self._listeners = []
+
+    # --- Читання ---
+
+    def load(self):
+        with self._lock:
+            if self._data is None:
+                with metrics.timer("store.load"):
+                    raw = self.backend.load()
+                if not raw and not self.backend.exists():
+                    raw = make_initial_data()
+                    self._dirty.update(raw.keys())
+                    # На диску цих білетів ще немає: None не збігається з жодним хешем.
+                    self._saved_hashes.update(dict.fromkeys(raw, None))
+                    self.schedule_flush()
+                data = {tid: Ticket.from_dict(t) for tid, t in raw.items()}
+                self._ids = {ticket.name: tid for tid, ticket in data.items()}
+                # Сортуємо один раз; далі порядок підтримується вставками bisect.
+                self._order = sorted(
+                    (natural_key(ticket.name), tid) for tid, ticket in data.items()
+                )
+                self._data = data
+            return self._data
+
+    @property
+    def is_loaded(self):
+        return self._data is not None
+
+    def load_async(self, callback):
+        """
+        Завантажує дані у фоновому потоці. callback() викликається через
+        dispatch виконавця — у застосунку це головний потік.
+        """
+        self.executor.submit(self.load, on_done=lambda data: callback())
+
+    def ticket_ids(self):
+        """
+        Ідентифікатори білетів у природному порядку назв («Білет 2» перед «Білет 10»).
+        """
+        with self._lock:
+            self.load()
+            return [tid for _, tid in self._order]
+
+    def tickets(self):
+        """
+        Список (id, назва) у природному порядку назв.
+        """
+        return self.versioned_tickets()[1]
+
+    def versioned_tickets(self):
+        """
+        (версія, tickets()) одним знімком: список уже містить усі зміни
+        з version не більшою за повернуту.
+        """
+        with self._lock:
+            data = self.load()
+            return self.version, [(tid, data[tid].name) for _, tid in self._order]
+
+    def has_ticket(self, ticket_id):
+        return ticket_id in self.load()
+
+    def find_ticket(self, name):
+        self.load()
+        return self._ids.get(name)
+
+    def ticket_name(self, ticket_id):
+        return self.get_ticket(ticket_id).name
+
+    def get_ticket(self, ticket_id):
+        return self.load().get(ticket_id) or Ticket()
+
+    def get_questions(self, ticket_id):
+        return self.get_ticket(ticket_id).questions
+
+    def filled_index(self):
+        """
+        Індекс заповнених запитань; після побудови підтримується при кожній зміні.
+        """
+        with self._lock:
+            if self._filled is None:
+                self._filled = {}
+                for ticket_id in self.load():
+                    self._refresh_filled(ticket_id)
+            return self._filled
+
+    def _refresh_filled(self, ticket_id):
+        if self._filled is None:
+            return
+        ticket = self._data.get(ticket_id)
+        indices = [i for i, q in enumerate(ticket.questions) if q.is_filled] if ticket else []
+        if indices:
+            self._filled[ticket_id] = indices
+        else:
+            self._filled.pop(ticket_id, None)
+
+    def search(self, query, limit=50):
+        """
+        Повертає список (id білета, індекс запитання, текст запитання).
+        """
+        if hasattr(self.backend, "search"):
+            # Індекс живе в базі, тож спершу скидаємо туди незбережені правки.
+            self.flush()
+            return self.backend.search(query, limit)
+        return self._scan(query, limit)
+
+    def _scan(self, query, limit):
+        # Повний перебір — запасний варіант для сховищ без індексу.
+        words = query.lower().split()
+        if not words:
+            return []
+        results = []
+        for ticket_id, ticket in self.load().items():
+            for idx, q in enumerate(ticket.questions):
+                haystack = f"{q.text} {q.answer_text}".lower()
+                if all(w in haystack for w in words):
+                    results.append((ticket_id, idx, q.text))
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    # --- Події ---
+
+    def subscribe(self, listener):
+        """
+        listener(change) викликається після кожної зміни в потоці, що її зробив.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _next_version(self):
+        # Викликається під _lock разом зі зміною, тож версія і знімок узгоджені.
+        self.version += 1
+        return self.version
+
+    def _emit(self, change):
+        # Викликається поза _lock: слухач може знову звертатися до сховища.
+        for listener in list(self._listeners):
+            listener(change)
+
+    # --- Запис ---
+
+    def _insert_order(self, name, ticket_id):
+        entry = (natural_key(name), ticket_id)
+        position = bisect.bisect_left(self._order, entry)
+        self._order.insert(position, entry)
+        return position
+
+    def _remove_order(self, name, ticket_id):
+        position = bisect.bisect_left(self._order, (natural_key(name), ticket_id))
+        del self._order[position]
+        return position
+
+    def set_question(self, ticket_id, index, question):
+        with self._lock:
+            questions = self.load()[ticket_id].questions
+            if index < len(questions) and questions[index] == question:
+                return
+            self._remember(ticket_id)
+            while len(questions) <= index:
+                questions.append(Question.placeholder(len(questions) + 1))
+            questions[index] = question
+            self._refresh_filled(ticket_id)
+            self.mark_dirty(ticket_id)
+            version = self._next_version()
+        self._emit(Change(QUESTION_UPDATED, ticket_id, question_index=index, version=version))
+
+    def set_questions(self, ticket_id, questions):
+        with self._lock:
+            ticket = self.load()[ticket_id]
+            if ticket.questions == questions:
+                return
+            self._remember(ticket_id)
+            ticket.questions = list(questions)
+            self._refresh_filled(ticket_id)
+            self.mark_dirty(ticket_id)
+            version = self._next_version()
+        self._emit(Change(QUESTION_UPDATED, ticket_id, version=version))
+
+    def add_ticket(self, name, questions, ticket_id=None):
+        """
+        Повертає id нового білета або None, якщо назва вже зайнята.
+        """
+        with self._lock:
+            data = self.load()
+            if name in self._ids:
+                return None
+            ticket_id = ticket_id or new_ticket_id()
+            data[ticket_id] = Ticket(name, list(questions))
+            # Новий білет ще не записаний, тож _remember не має брати хеш з пам'яті.
+            self._saved_hashes[ticket_id] = None
+            self._ids[name] = ticket_id
+            position = self._insert_order(name, ticket_id)
+            self._refresh_filled(ticket_id)
+            self.mark_dirty(ticket_id)
+            version = self._next_version()
+        self._emit(Change(TICKET_ADDED, ticket_id, position=position, version=version))
+        return ticket_id
+
+    def rename_ticket(self, ticket_id, new_name):
+        with self._lock:
+            data = self.load()
+            ticket = data.get(ticket_id)
+            if ticket is None or new_name in self._ids:
+                return False
+            self._remember(ticket_id)
+            # Порядок оновлюється на місці: одне видалення і одна вставка.
+            old_position = self._remove_order(ticket.name, ticket_id)
+            position = self._insert_order(new_name, ticket_id)
+            del self._ids[ticket.name]
+            self._ids[new_name] = ticket_id
+            ticket.name = new_name
+            self.mark_dirty(ticket_id)
+            version = self._next_version()
+        self._emit(
+            Change(
+                TICKET_RENAMED,
+                ticket_id,
+                position=position,
+                old_position=old_position,
+                version=version,
+            )
+        )
+        return True
+
+    def remove_ticket(self, ticket_id):
+        with self._lock:
+            ticket = self.load().pop(ticket_id, None)
+            if ticket is None:
+                return False
+            old_position = self._remove_order(ticket.name, ticket_id)
+            del self._ids[ticket.name]
+            self._dirty.discard(ticket_id)
+            self._removed.add(ticket_id)
+            self._refresh_filled(ticket_id)
+            self.schedule_flush()
+            version = self._next_version()
+        self._emit(Change(TICKET_REMOVED, ticket_id, old_position=old_position, version=version))
+        return True
+
+    def _remember(self, ticket_id):
+        # Хеш збереженої версії рахуємо ліниво — лише для білетів, які редагують.
+        # Для ще не записаних білетів там уже лежить None.
+        if ticket_id not in self._saved_hashes and ticket_id in self._data:
+            self._saved_hashes[ticket_id] = ticket_hash(self._data[ticket_id].to_dict())
+
+    def mark_dirty(self, ticket_id):
+        with self._lock:
+            self._dirty.add(ticket_id)
+            self.schedule_flush()
+
+    @property
+    def is_dirty(self):
+        return bool(self._dirty or self._removed)
+
+    # --- Збереження ---
+
+    def schedule_flush(self):
+        # Кожна нова зміна відкладає запис: серія швидких правок дає один запис.
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self, raise_errors=False):
+        """
+        Записує накопичені зміни. Якщо запис не вдався, зміни лишаються в черзі
+        і помилка лише логується (таймер, on_pause, пошук); з raise_errors=True
+        вона передається далі — так робить close().
+        """
+        # Записи йдуть строго по черзі, тож старіший знімок ніколи не ляже
+        # поверх новішого. UI-потік тримає лише короткий _lock.
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._data is None or not self.is_dirty:
+                    return
+                data = self._data
+                order = list(data)
+                # to_dict() створює нові словники — це і є знімок для запису.
+                changed = {tid: data[tid].to_dict() for tid in self._dirty if tid in data}
+                removed = {tid for tid in self._removed if tid not in data}
+                snapshot = (
+                    None
+                    if self.backend.incremental
+                    else {tid: ticket.to_dict() for tid, ticket in data.items()}
+                )
+                self._dirty.clear()
+                self._removed.clear()
+
+            hashes = {tid: ticket_hash(ticket) for tid, ticket in changed.items()}
+            # Якщо вміст не змінився (наприклад, правку скасували) — не пишемо.
+            changed = {
+                tid: ticket
+                for tid, ticket in changed.items()
+                if hashes[tid] != self._saved_hashes.get(tid)
+            }
+            if not changed and not removed:
+                return
+
+            try:
+                with metrics.timer("store.flush"):
+                    if self.backend.incremental:
+                        self.backend.save_tickets(changed, removed, order)
+                    else:
+                        self.backend.save(snapshot)
+            except Exception:
+                # Запис не вдався — зміни лишаються в пам'яті, тож повертаємо їх
+                # у чергу: наступний flush (або close) спробує ще раз.
+                with self._lock:
+                    self._dirty.update(changed)
+                    self._removed.update(tid for tid in removed if tid not in self._data)
+                if raise_errors:
+                    raise
+                log.exception("Не вдалося зберегти зміни білетів")
+                return
+            for tid in changed:
+                self._saved_hashes[tid] = hashes[tid]
+            for tid in removed:
+                self._saved_hashes.pop(tid, None)
+            self.write_count += 1
+
+    def close(self):
+        # Спершу дочікуємося фонових збережень, щоб їхні зміни потрапили на диск.
+        self.executor.shutdown(wait=True)
+        try:
+            # Останній шанс зберегти зміни: помилку бачить той, хто закриває.
+            self.flush(raise_errors=True)
+        finally:
+            self.backend.close()
@@ -0,0 +1,91 @@
+"""
+Фонові задачі: копіювання зображень, збереження запитань, завантаження даних.
+Без Kivy — застосунок лише передає dispatch, що переносить колбеки
+в головний потік (Clock.schedule_once).
+"""
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from instrumentation import get_logger, metrics
+
+log = get_logger(__name__)
+
+MAX_WORKERS = 4
+
+
+def call_now(func):
+    return func()
+
+
+class TaskExecutor:
+    """
+    Невеликий пул потоків для файлових операцій.
+    Задачі з однаковим ключем виконуються строго по черзі в порядку подання,
+    тож два збереження одного запитання ніколи не поміняються місцями.
+    Колбеки on_done/on_error викликаються через dispatch.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, dispatch=call_now):
+        self.dispatch = dispatch
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="examtickets-worker")
+        self._lock = threading.Lock()
+        # {ключ: черга задач, що чекають на завершення попередньої з тим самим ключем}
+        self._queues = {}
+        self.pending = 0
+
+    def submit(self, func, *args, key=None, on_done=None, on_error=None, **kwargs):
+        """
+        Ставить func(*args, **kwargs) у чергу і повертає Future.
+        on_done(результат) і on_error(виняток) — необов'язкові колбеки.
+        """
+        future = Future()
+        task = (future, func, args, kwargs, on_done, on_error)
+        with self._lock:
+            self.pending += 1
+            if key is not None:
+                if key in self._queues:
+                    # Потік, що виконує попередню задачу з цим ключем, візьме і цю.
+                    self._queues[key].append(task)
+                    return future
+                self._queues[key] = deque()
+        self._pool.submit(self._run, key, task)
+        return future
+
+    def _run(self, key, task):
+        while task is not None:
+            self._execute(task)
+            with self._lock:
+                self.pending -= 1
+                task = None
+                if key is not None:
+                    queue = self._queues[key]
+                    if queue:
+                        task = queue.popleft()
+                    else:
+                        del self._queues[key]
+
+    def _execute(self, task):
+        future, func, args, kwargs, on_done, on_error = task
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with metrics.timer("workers.task"):
+                result = func(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            if on_error is not None:
+                self.dispatch(functools.partial(on_error, e))
+            else:
+                log.exception("Фонова задача %r завершилася помилкою", func)
+            return
+        future.set_result(result)
+        if on_done is not None:
+            self.dispatch(functools.partial(on_done, result))
+
+    def shutdown(self, wait=True):
+        """
+        Дочікується поставлених задач (разом із чергами за ключами) і зупиняє пул.
+        """
+        self._pool.shutdown(wait=wait)